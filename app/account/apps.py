@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class AccountConfig(AppConfig):
     name = 'account'
+
+    def ready(self):
+        from account.signals import connect_signals
+        connect_signals()
@@ -0,0 +1,162 @@
+import copy
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.lru import LRUCache
+
+
+# Tokens (with their user) looked up by this process, with the shared
+# generation of their user's tokens they were looked up at. The shared
+# cache only maps token keys to their user id and active flag
+local_tokens = LRUCache(
+    maxsize=settings.TOKEN_AUTH_CACHE_SIZE,
+    ttl=settings.TOKEN_AUTH_CACHE_TTL
+)
+
+
+def _shared_cache():
+    """
+    Return the cache shared between processes, if one is configured
+    """
+    if settings.TOKEN_AUTH_CACHE_ALIAS:
+        return caches[settings.TOKEN_AUTH_CACHE_ALIAS]
+
+    return None
+
+
+def _shared_key(key):
+    return f'auth-token:{key}'
+
+
+def _generation_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def user_generation(shared, user_id):
+    """
+    Return the shared generation of a user's tokens, starting one when
+    it is missing so no entry of an evicted generation matches it
+    """
+    key = _generation_key(user_id)
+    generation = shared.get(key)
+    if generation is None:
+        shared.add(key, uuid.uuid4().hex, timeout=None)
+        generation = shared.get(key)
+
+    return generation
+
+
+def _bump_generation(user_id):
+    shared = _shared_cache()
+    if shared is not None:
+        shared.set(_generation_key(user_id), uuid.uuid4().hex, timeout=None)
+
+
+def _forget_generation(user_id):
+    """
+    Invalidate the tokens of a user every process cached, now and again
+    on commit for lookups that ran before the end of the transaction
+    """
+    _bump_generation(user_id)
+    transaction.on_commit(lambda: _bump_generation(user_id))
+
+
+def forget_token(key, user_id):
+    """
+    Drop a token from every cache tier
+    """
+    local_tokens.delete(key)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(_shared_key(key))
+    _forget_generation(user_id)
+
+
+def forget_user_tokens(user_id):
+    """
+    Drop all tokens of a user from every cache tier
+    """
+    local_tokens.delete_where(lambda entry: entry[1].user_id == user_id)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete_many([
+            _shared_key(key) for key in
+            Token.objects.filter(user_id=user_id).values_list(
+                'key', flat=True
+            )
+        ])
+    _forget_generation(user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that caches successful token lookups
+
+    Tokens are kept in a bounded in-process LRU and, when
+    TOKEN_AUTH_CACHE_ALIAS is set, in a shared cache. Entries are
+    dropped on logout, token changes and user changes. Those bump the
+    user's generation in the shared cache as well, which local entries
+    are checked against so every process stops serving them
+    """
+
+    def authenticate_credentials(self, key):
+        shared = _shared_cache()
+        cached = local_tokens.get(key)
+        if cached is not None and shared is not None:
+            generation = user_generation(shared, cached[1].user_id)
+            if generation is None or generation != cached[0]:
+                cached = None
+        if cached is None:
+            token = self.shared_token(key)
+            generation = None
+            if shared is not None:
+                generation = user_generation(shared, token.user_id)
+            local_tokens.set(key, (generation, token))
+        else:
+            token = cached[1]
+
+        # Requests may modify their user, never share the cached one
+        token = copy.deepcopy(token)
+
+        return (token.user, token)
+
+    def shared_token(self, key):
+        """
+        Return a token looked up through the shared cache, if any
+
+        The shared cache holds the user id and active flag of a token
+        only, never the user row with its password hash, and the user
+        is loaded by primary key
+        """
+        shared = _shared_cache()
+        cached = None if shared is None else shared.get(_shared_key(key))
+        if cached is None:
+            token = super().authenticate_credentials(key)[1]
+            if shared is not None:
+                shared.set(_shared_key(key),
+                           (token.user_id, token.user.is_active),
+                           timeout=settings.TOKEN_AUTH_CACHE_TTL)
+            return token
+
+        user_id, is_active = cached
+        user = None
+        if is_active:
+            user = get_user_model().objects.filter(
+                pk=user_id,
+                is_active=True
+            ).first()
+        if user is None:
+            shared.delete(_shared_key(key))
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        return Token(key=key, user=user)
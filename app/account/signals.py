@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from rest_framework.authtoken.models import Token
+
+from account.authentication import forget_token, forget_user_tokens
+
+
+def token_changed(sender, instance, **kwargs):
+    """
+    Drop a rotated or deleted token from the authentication caches
+    """
+    forget_token(instance.key, instance.user_id)
+
+
+def user_changed(sender, instance, **kwargs):
+    """
+    Drop the tokens of a changed user, e.g. on deactivation
+    """
+    forget_user_tokens(instance.pk)
+
+
+def connect_signals():
+    post_save.connect(token_changed, sender=Token)
+    post_delete.connect(token_changed, sender=Token)
+    post_save.connect(user_changed, sender=get_user_model())
+    post_delete.connect(user_changed, sender=get_user_model())
@@ -0,0 +1,150 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from account.authentication import local_tokens
+
+
+MANAGE_USER_URL = reverse('account:account-manage')
+LOGOUT_URL = reverse('account:account-logout')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """
+    Test the cached token authentication
+    """
+
+    def setUp(self):
+        local_tokens.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@webgurus.co.ke',
+            password='testpass',
+            name='Test'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_cached(self):
+        """
+        Test a repeated request authenticates without a token query
+        """
+        self.client.get(MANAGE_USER_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(MANAGE_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    @override_settings(TOKEN_AUTH_CACHE_ALIAS='default')
+    def test_shared_cache_holds_user_id(self):
+        """
+        Test the shared cache keeps the user id and active flag of a
+        token, not the user, and serves other processes from them
+        """
+        cache.clear()
+        self.client.get(MANAGE_USER_URL)
+        local_tokens.clear()
+
+        self.assertEqual(cache.get(f'auth-token:{self.token.key}'),
+                         (self.user.pk, True))
+        with self.assertNumQueries(1):
+            res = self.client.get(MANAGE_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    @override_settings(TOKEN_AUTH_CACHE_ALIAS='default')
+    def test_other_process_entries_invalidated(self):
+        """
+        Test token entries another process cached stop authenticating
+        once the token or its user changes
+        """
+        cache.clear()
+        key = self.token.key
+
+        def other_process_entry():
+            self.client.get(MANAGE_USER_URL)
+            return local_tokens.get(key)
+
+        # The other process keeps its entry, only the shared generation
+        # tells it the user changed
+        entry = other_process_entry()
+        self.client.patch(MANAGE_USER_URL, {'name': 'New name'})
+        local_tokens.set(key, entry)
+        res = self.client.get(MANAGE_USER_URL)
+        self.assertEqual(res.data['name'], 'New name')
+
+        entry = other_process_entry()
+        self.user.is_active = False
+        self.user.save()
+        local_tokens.set(key, entry)
+        res = self.client.get(MANAGE_USER_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.user.is_active = True
+        self.user.save()
+        entry = other_process_entry()
+        self.token.delete()
+        local_tokens.set(key, entry)
+        res = self.client.get(MANAGE_USER_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_invalidates_token(self):
+        """
+        Test a logged out token is rejected
+        """
+        self.client.get(MANAGE_USER_URL)
+
+        res = self.client.post(LOGOUT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        res = self.client.get(MANAGE_USER_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rotated_token_rejected(self):
+        """
+        Test a token replaced with a new one is rejected
+        """
+        self.client.get(MANAGE_USER_URL)
+        self.token.delete()
+        Token.objects.create(user=self.user)
+
+        res = self.client.get(MANAGE_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """
+        Test a cached token stops working once its user is deactivated
+        """
+        self.client.get(MANAGE_USER_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(MANAGE_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_update_does_not_restore_cached_fields(self):
+        """
+        Test updating the account never writes back cached user fields
+        """
+        self.client.get(MANAGE_USER_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_staff=True
+        )
+
+        res = self.client.patch(MANAGE_USER_URL, {'name': 'New name'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'New name')
+        self.assertTrue(self.user.is_staff)
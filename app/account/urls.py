@@ -11,5 +11,7 @@ urlpatterns = [
     path('account-token/', views.CreateTokentView.as_view(),
          name='account-token'),
     path('account-manage/', views.ManageUserAccountView.as_view(),
-         name='account-manage')
+         name='account-manage'),
+    path('account-logout/', views.LogoutView.as_view(),
+         name='account-logout'),
 ]
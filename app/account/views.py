@@ -1,8 +1,13 @@
 from django.contrib.auth import get_user_model
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from core.replicas import ReplicaReadMixin
+
+from .authentication import CachedTokenAuthentication
 from .serializers import UserAccountSerializer, AuthTokenSerializer
 
 
@@ -21,17 +26,39 @@ class CreateTokentView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
-class ManageUserAccountView(generics.RetrieveUpdateAPIView):
+class ManageUserAccountView(
+    ReplicaReadMixin,
+    generics.RetrieveUpdateAPIView
+):
     """
     Manage the authenticated user details
     """
     serializer_class = UserAccountSerializer
     queryset = get_user_model().objects.all()
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         """
         Retrieve and return authenticated user account
         """
-        return self.request.user
+        user = self.request.user
+        if self.request.method not in permissions.SAFE_METHODS:
+            # The authenticated user may come from the token cache,
+            # never save stale fields over the current row
+            user.refresh_from_db()
+
+        return user
+
+
+class LogoutView(APIView):
+    """
+    Log out by deleting the auth token used for the request
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        request.auth.delete()
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,14 @@
+"""
+URLconf of app.asgi: app.urls with the async recipe views
+"""
+from django.urls import path, include
+
+from app import urls
+from recipe.urls import app_name as recipe_app_name, async_urlpatterns
+
+urlpatterns = [
+    path('api/recipe/', include((async_urlpatterns, recipe_app_name))),
+] + [
+    pattern for pattern in urls.urlpatterns
+    if getattr(pattern, 'app_name', None) != recipe_app_name
+]
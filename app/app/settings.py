@@ -1,16 +1,21 @@
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
-SECRET_KEY = 'x-)*2qf4#*n^$5o%al!vyh1ob_vrfq6@kctje1y1&-n99qyp$m'
+SECRET_KEY = os.environ.get(
+    'SECRET_KEY',
+    'x-)*2qf4#*n^$5o%al!vyh1ob_vrfq6@kctje1y1&-n99qyp$m'
+)
 
 
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = list(filter(None, os.environ.get('ALLOWED_HOSTS', '').split(',')))
 
 
 # Application definition
@@ -40,6 +45,8 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'app.urls'
+# URLconf of app.asgi, with the async recipe views ('' for ROOT_URLCONF)
+ASGI_URLCONF = os.environ.get('ASGI_URLCONF', 'app.asgi_urls')
 
 TEMPLATES = [
     {
@@ -65,14 +72,86 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # PostgreSQL with the connection limit and health checks below
+        'ENGINE': 'core.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Each thread keeps its connection this many seconds across
+        # requests (0 closes it at the end of every request)
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # Ping a kept connection before the first query of a request
+        'CONN_HEALTH_CHECKS': os.environ.get(
+            'DB_CONN_HEALTH_CHECKS', '1'
+        ) == '1',
+        # Connections a process opens at once (0 for no limit): one per
+        # request thread, async view thread and image worker by default.
+        # A thread over the limit waits POOL_TIMEOUT seconds for a free one
+        'POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', (
+            int(os.environ.get('GUNICORN_THREADS', 1)) +
+            int(os.environ.get('ASYNC_VIEW_THREADS', 4)) +
+            int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+        ))),
+        'POOL_TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
     }
 }
 
+# Read replicas of the default database (comma separated hosts), they
+# serve the safe requests of the recipe and account views. Tests read
+# the default database through them
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get(
+    'DB_REPLICA_HOSTS', ''
+).split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        # Stand-in replicas can be other databases of the same server
+        'NAME': os.environ.get('DB_REPLICA_NAME') or DATABASES['default'][
+            'NAME'
+        ],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# A user's reads stay on the default database this long after a write
+DATABASE_REPLICA_PIN_SECONDS = int(
+    os.environ.get('DATABASE_REPLICA_PIN_SECONDS', 5)
+)
+DATABASE_REPLICA_CACHE_ALIAS = os.environ.get(
+    'DATABASE_REPLICA_CACHE_ALIAS', 'default'
+)
+
+
+# Cache
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# Memcached (django.core.cache.backends.memcached.MemcachedCache) when
+# running more than one process
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# The version stamps, ETags and replica pins kept in the cache must be
+# the same in every worker process
+if not DEBUG and int(os.environ.get('WEB_CONCURRENCY') or 1) > 1:
+    for alias, cache in CACHES.items():
+        if cache['BACKEND'].endswith('.LocMemCache'):
+            raise ImproperlyConfigured(
+                f'The {alias} cache is local to each of the '
+                f'{os.environ["WEB_CONCURRENCY"]} worker processes, set '
+                f'CACHE_BACKEND and CACHE_LOCATION to a shared cache'
+            )
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -120,3 +199,88 @@ STATIC_ROOT = '/vol/web/static'
 AUTH_USER_MODEL = 'core.CustomUser'
 
 TIME_ZONE = 'Africa/Nairobi'
+
+
+# Pagination for the recipe app list endpoints
+
+RECIPE_APP_PAGE_SIZE = int(os.environ.get('RECIPE_APP_PAGE_SIZE', 50))
+RECIPE_APP_MAX_PAGE_SIZE = int(os.environ.get('RECIPE_APP_MAX_PAGE_SIZE', 200))
+
+# Rows read per server-side cursor fetch when streaming recipe exports
+RECIPE_EXPORT_CHUNK_SIZE = int(os.environ.get('RECIPE_EXPORT_CHUNK_SIZE', 500))
+
+# Per user response cache of the recipe app list/retrieve endpoints
+RECIPE_APP_CACHE_ALIAS = os.environ.get('RECIPE_APP_CACHE_ALIAS', 'default')
+RECIPE_APP_CACHE_TIMEOUT = int(os.environ.get('RECIPE_APP_CACHE_TIMEOUT', 300))
+
+# Token authentication cache: per process LRU plus an optional shared tier
+TOKEN_AUTH_CACHE_SIZE = int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 1024))
+TOKEN_AUTH_CACHE_TTL = int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60))
+TOKEN_AUTH_CACHE_ALIAS = os.environ.get('TOKEN_AUTH_CACHE_ALIAS')
+
+# Largest list accepted by the recipe app bulk endpoints
+RECIPE_APP_BULK_MAX_ITEMS = int(os.environ.get('RECIPE_APP_BULK_MAX_ITEMS', 1000))
+
+# Threads running the async views under ASGI (see core.async_views)
+ASYNC_VIEW_THREADS = int(os.environ.get('ASYNC_VIEW_THREADS', 4))
+
+# Background processing of uploaded recipe images
+# (0 workers processes them inline on the request thread)
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_VARIANTS = {
+    'thumb': 160,
+    'medium': 640,
+    'full': 2048,
+}
+# WEBP falls back to JPEG when Pillow lacks WebP support
+RECIPE_IMAGE_FORMAT = os.environ.get('RECIPE_IMAGE_FORMAT', 'WEBP')
+RECIPE_IMAGE_QUALITY = int(os.environ.get('RECIPE_IMAGE_QUALITY', 80))
+
+# On the fly recipe image renditions (/recipes/{id}/image?w=)
+RECIPE_IMAGE_WIDTHS = (160, 320, 640, 1280)
+RECIPE_IMAGE_CACHE_DIR = os.environ.get(
+    'RECIPE_IMAGE_CACHE_DIR', '/vol/web/cache/renditions'
+)
+RECIPE_IMAGE_CACHE_MAX_BYTES = int(
+    os.environ.get('RECIPE_IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_AGE = int(os.environ.get('RECIPE_IMAGE_MAX_AGE', 3600))
+
+# Resumable recipe image uploads, assembled outside of MEDIA_ROOT
+RECIPE_UPLOAD_DIR = os.environ.get('RECIPE_UPLOAD_DIR', '/vol/web/uploads')
+RECIPE_UPLOAD_MAX_BYTES = int(
+    os.environ.get('RECIPE_UPLOAD_MAX_BYTES', 20 * 1024 * 1024)
+)
+# Bytes read from the request body per write while streaming a chunk
+RECIPE_UPLOAD_BUFFER_SIZE = int(
+    os.environ.get('RECIPE_UPLOAD_BUFFER_SIZE', 64 * 1024)
+)
+# Uploads idle for longer are expired by the collect_images command and
+# no longer count towards the uploads a user may have open at once
+RECIPE_UPLOAD_EXPIRE_SECONDS = int(
+    os.environ.get('RECIPE_UPLOAD_EXPIRE_SECONDS', 24 * 3600)
+)
+RECIPE_UPLOAD_MAX_OPEN = int(os.environ.get('RECIPE_UPLOAD_MAX_OPEN', 10))
+
+# Text search configuration of the recipe search vectors (?q=)
+RECIPE_SEARCH_CONFIG = os.environ.get('RECIPE_SEARCH_CONFIG', 'english')
+
+# Tag/ingredient autocomplete: per process tries of the most recently
+# used accounts, accounts with more objects are queried directly, as
+# are limits above the ids kept per trie node. The cache is bounded by
+# the total of names, nodes and ids of its tries
+RECIPE_AUTOCOMPLETE_LIMIT = 10
+RECIPE_AUTOCOMPLETE_MAX_LIMIT = 50
+RECIPE_AUTOCOMPLETE_TRIE_SIZE = 10
+RECIPE_AUTOCOMPLETE_CACHE_ENTRIES = int(
+    os.environ.get('RECIPE_AUTOCOMPLETE_CACHE_ENTRIES', 500000)
+)
+RECIPE_AUTOCOMPLETE_CACHE_TTL = int(
+    os.environ.get('RECIPE_AUTOCOMPLETE_CACHE_TTL', 600)
+)
+RECIPE_AUTOCOMPLETE_TRIE_MAX_ITEMS = int(
+    os.environ.get('RECIPE_AUTOCOMPLETE_TRIE_MAX_ITEMS', 5000)
+)
+
+# Most used tags and ingredients broken down by /recipes/stats/
+RECIPE_STATS_MAX_GROUPS = int(os.environ.get('RECIPE_STATS_MAX_GROUPS', 100))
@@ -0,0 +1,147 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+
+
+_executor = None
+
+
+def get_executor():
+    """
+    Return the process wide pool running the async views
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_VIEW_THREADS,
+            thread_name_prefix='async-view'
+        )
+
+    return _executor
+
+
+async def run_in_pool(func, *args, **kwargs):
+    """
+    Run a blocking function on the async view threads and return its
+    result, with the context variables of the caller
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+
+    return await loop.run_in_executor(
+        get_executor(),
+        functools.partial(context.run, _run_job, func, args, kwargs)
+    )
+
+
+def _run_job(func, args, kwargs):
+    # The pool threads keep their connections between requests, expire
+    # them as the request signals do on request threads
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def _render_view(view, request, *args, **kwargs):
+    response = view(request, *args, **kwargs)
+    # Django renders deferred responses on its single thread for sync
+    # code, render them on the pool thread with the rest of the view
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+
+    return response
+
+
+class AsyncViewMixin:
+    """
+    Serve a viewset as an async view under ASGI
+
+    Django runs sync views of an ASGI application one at a time on a
+    single thread. These views hand each request to a pool of
+    ASYNC_VIEW_THREADS threads instead, so as many requests query the
+    database or read uploads at once, while the event loop keeps
+    accepting requests
+    """
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            return await run_in_pool(
+                _render_view, view, request, *args, **kwargs
+            )
+
+        # Keep the csrf_exempt flag and the attributes routers read
+        return functools.update_wrapper(async_view, view)
+
+
+class AsyncURLConfHandler(ASGIHandler):
+    """
+    ASGI handler resolving requests with ASGI_URLCONF, which routes the
+    async views
+    """
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None and settings.ASGI_URLCONF:
+            request.urlconf = settings.ASGI_URLCONF
+
+        return request, error_response
+
+    async def send_response(self, response, send):
+        """
+        Send streaming responses from an async view thread
+
+        Django iterates them on the event loop, where the queries of a
+        streamed export are not allowed
+        """
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ] + [
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        ]
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        loop = asyncio.get_running_loop()
+
+        def send_parts():
+            # Waiting for each send holds the iterator to the client pace
+            for part in response:
+                for chunk, _ in self.chunk_bytes(part):
+                    asyncio.run_coroutine_threadsafe(send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    }), loop).result()
+
+        try:
+            await run_in_pool(send_parts)
+            await send({'type': 'http.response.body'})
+        finally:
+            await run_in_pool(response.close)
+
+
+def get_asgi_application():
+    """
+    Return the ASGI application of the project, as Django's does
+    """
+    django.setup(set_prefix=False)
+
+    return AsyncURLConfHandler()
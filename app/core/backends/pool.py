@@ -0,0 +1,132 @@
+import threading
+import time
+
+
+class ConnectionSlots:
+    """
+    Cap on the connections a process holds open to one database, with
+    counters of how long threads waited for a free slot
+
+    Connections are registered with the thread that opened them. Those
+    left open by threads that have exited, as persistent connections of
+    servers running a thread per request are, are closed and their slot
+    reclaimed when another thread needs one
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._cond = threading.Condition()
+        self._in_use = 0
+        # Open connections with their owning thread, by id
+        self._owners = {}
+        self._counters = {
+            'opened': 0,
+            'closed': 0,
+            'reclaimed': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+        }
+
+    def count(self, **increments):
+        with self._cond:
+            for name, value in increments.items():
+                self._counters[name] += value
+
+    def acquire(self, timeout=None):
+        """
+        Take a slot, waiting up to timeout seconds for one to be freed
+        """
+        with self._cond:
+            start = None
+            while self._in_use >= self.size and not self._reclaim():
+                now = time.monotonic()
+                if start is None:
+                    start = now
+                    self._counters['waits'] += 1
+                remaining = None if timeout is None else start + timeout - now
+                if remaining is not None and remaining <= 0:
+                    self._counters['wait_seconds'] += now - start
+                    self._counters['timeouts'] += 1
+                    return False
+                self._cond.wait(remaining)
+            if start is not None:
+                self._counters['wait_seconds'] += time.monotonic() - start
+            self._in_use += 1
+            self._counters['opened'] += 1
+
+            return True
+
+    def register(self, connection):
+        """
+        Record the connection opened with the last slot taken
+        """
+        with self._cond:
+            self._owners[id(connection)] = (
+                threading.current_thread(),
+                connection
+            )
+
+    def release(self, connection=None):
+        """
+        Give back the slot of a closed connection, or of a connection
+        that failed to open
+        """
+        with self._cond:
+            if connection is not None and \
+                    self._owners.pop(id(connection), None) is None:
+                # Already reclaimed
+                return
+            self._in_use -= 1
+            self._counters['closed'] += 1
+            self._cond.notify()
+
+    def _reclaim(self):
+        """
+        Close the connections of exited threads, return whether a slot
+        was freed
+        """
+        exited = [key for key, (thread, _) in self._owners.items()
+                  if not thread.is_alive()]
+        for key in exited:
+            _, connection = self._owners.pop(key)
+            try:
+                connection.close()
+            except Exception:
+                pass
+            self._in_use -= 1
+            self._counters['reclaimed'] += 1
+
+        return bool(exited)
+
+    def stats(self):
+        with self._cond:
+            counters = dict(self._counters)
+            counters['in_use'] = self._in_use
+        counters['size'] = self.size
+
+        return counters
+
+
+# Connection slots of this process by database alias
+_slots = {}
+_slots_lock = threading.Lock()
+
+
+def get_slots(alias, size):
+    with _slots_lock:
+        if alias not in _slots:
+            _slots[alias] = ConnectionSlots(size)
+
+        return _slots[alias]
+
+
+def pool_stats():
+    """
+    Return the connection counters of this process by database alias
+    """
+    with _slots_lock:
+        slots = dict(_slots)
+
+    return {alias: alias_slots.stats() for alias, alias_slots in slots.items()}
@@ -0,0 +1,77 @@
+from django.db.backends.postgresql import base
+
+from core.backends.pool import get_slots
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend bounding the connections of a process and
+    checking persistent connections before they are reused
+
+    Django keeps one connection per thread for CONN_MAX_AGE seconds.
+    POOL_SIZE caps how many of them a process opens at once, threads
+    over it wait up to POOL_TIMEOUT seconds for another one to close.
+    With CONN_HEALTH_CHECKS, a connection kept from an earlier request
+    is pinged before its first query in the next one, so a connection
+    the server dropped meanwhile is replaced instead of failing it
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    @property
+    def slots(self):
+        size = self.settings_dict.get('POOL_SIZE')
+        if not size:
+            return None
+
+        return get_slots(self.alias, size)
+
+    def get_new_connection(self, conn_params):
+        slots = self.slots
+        if slots is None:
+            return super().get_new_connection(conn_params)
+
+        timeout = self.settings_dict.get('POOL_TIMEOUT')
+        if not slots.acquire(timeout):
+            raise base.Database.OperationalError(
+                f'No connection to {self.alias} freed up within {timeout}s '
+                f'(POOL_SIZE={slots.size})'
+            )
+        try:
+            connection = super().get_new_connection(conn_params)
+        except BaseException:
+            slots.release()
+            raise
+        slots.register(connection)
+        self.health_check_done = True
+
+        return connection
+
+    def _close(self):
+        connection = self.connection
+        try:
+            return super()._close()
+        finally:
+            if self.slots is not None:
+                self.slots.release(connection)
+
+    def ensure_connection(self):
+        if (
+            self.connection is not None and
+            not self.health_check_done and
+            not self.in_atomic_block and
+            self.settings_dict.get('CONN_HEALTH_CHECKS')
+        ):
+            self.health_check_done = True
+            if not self.is_usable():
+                if self.slots is not None:
+                    self.slots.count(health_check_failures=1)
+                self.close()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Called as requests start and finish, check again in the next
+        self.health_check_done = False
@@ -0,0 +1,80 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Min, Q
+
+
+def duplicate_groups(model, batch_size, after=None, using=DEFAULT_DB_ALIAS):
+    """
+    Return the next batch of (user_id, normalized_name) groups holding
+    more than one object, with the lowest id of each, after a key
+    """
+    groups = model.objects.using(using).values(
+        'user_id', 'normalized_name'
+    ).annotate(
+        objects=Count('id'),
+        keep_id=Min('id')
+    ).filter(objects__gt=1)
+    if after is not None:
+        user_id, normalized_name = after
+        groups = groups.filter(
+            Q(user_id__gt=user_id) |
+            Q(user_id=user_id, normalized_name__gt=normalized_name)
+        )
+
+    return list(groups.order_by('user_id', 'normalized_name')[:batch_size])
+
+
+def merge_duplicates(model, through, link_field, batch_size=500,
+                     using=DEFAULT_DB_ALIAS, on_merge=None):
+    """
+    Merge objects sharing a user and normalized name into the oldest one
+
+    Links to the duplicates are moved onto the kept object through the
+    recipe through model, then the duplicates are deleted. Each batch
+    of groups commits on its own, so an interrupted run can be started
+    again and carries on with the groups left. Yields the number of
+    objects merged and the last group key of every batch
+
+    No m2m_changed signal is sent, on_merge is called in each batch's
+    transaction with the ids of the relinked recipes and of the users
+    owning the groups instead
+    """
+    after = None
+    while True:
+        groups = duplicate_groups(model, batch_size, after, using)
+        if not groups:
+            return
+        with transaction.atomic(using=using):
+            merged, recipe_ids = _merge_groups(
+                model, through, link_field, groups, using
+            )
+            if on_merge is not None:
+                on_merge(recipe_ids, {group['user_id'] for group in groups})
+        after = (groups[-1]['user_id'], groups[-1]['normalized_name'])
+        yield merged, after
+
+
+def _merge_groups(model, through, link_field, groups, using):
+    keep = {(group['user_id'], group['normalized_name']): group['keep_id']
+            for group in groups}
+    candidates = model.objects.using(using).select_for_update().filter(
+        user_id__in={user_id for user_id, _ in keep},
+        normalized_name__in={name for _, name in keep}
+    ).values_list('id', 'user_id', 'normalized_name')
+    replaced = {pk: keep[(user_id, name)]
+                for pk, user_id, name in candidates
+                if (user_id, name) in keep and pk != keep[(user_id, name)]}
+
+    # A recipe already linked to the kept object keeps a single link
+    links = through.objects.using(using).filter(
+        **{f'{link_field}__in': replaced}
+    )
+    rows = list(links.values_list('recipe_id', link_field))
+    through.objects.using(using).bulk_create(
+        (through(**{'recipe_id': recipe_id, link_field: replaced[pk]})
+         for recipe_id, pk in rows),
+        ignore_conflicts=True
+    )
+    links.delete()
+    model.objects.using(using).filter(pk__in=replaced).delete()
+
+    return len(replaced), {recipe_id for recipe_id, _ in rows}
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread safe in-process cache bounded by size, with an optional
+    time to live, evicting the least recently used entries first
+
+    The size is the total weight of the entries, one each unless set
+    is given another
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.weight = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, _, value = self._data[key]
+            except KeyError:
+                return default
+            if expires is not None and expires < time.monotonic():
+                self._pop(key)
+                return default
+            self._data.move_to_end(key)
+
+            return value
+
+    def set(self, key, value, weight=1):
+        expires = None
+        if self.ttl is not None:
+            expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._pop(key)
+            if weight > self.maxsize:
+                return
+            self._data[key] = (expires, weight, value)
+            self.weight += weight
+            while self.weight > self.maxsize:
+                self._pop(next(iter(self._data)))
+
+    def _pop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.weight -= entry[1]
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def delete_where(self, predicate):
+        """
+        Remove the entries whose value matches the predicate
+        """
+        with self._lock:
+            for key in [key for key, (_, _, value) in self._data.items()
+                        if predicate(value)]:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,256 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef
+
+from core.models import Tag, Ingredient, Recipe
+
+
+# Indexes added for the recipe API query shapes, dropped inside the
+# benchmark transaction to measure the plans without them
+QUERY_SHAPE_INDEXES = (
+    'core_tag_user_name_idx',
+    'core_ingredient_user_name_idx',
+    'core_recipe_user_id_idx',
+    'core_recipe_tags_tag_recipe_idx',
+    'core_recipe_ingredients_ing_recipe_idx',
+    'core_tag_user_name_prefix_idx',
+    'core_ingredient_user_name_prefix_idx',
+    'core_recipe_user_price_idx',
+    'core_recipe_user_duration_idx',
+)
+
+PAGE_SIZE = 50
+
+
+def tag_list(ctx):
+    return Tag.objects.filter(
+        user=ctx['user']
+    ).order_by('-name', '-id')[:PAGE_SIZE]
+
+
+def ingredient_list(ctx):
+    return Ingredient.objects.filter(
+        user=ctx['user']
+    ).order_by('-name', '-id')[:PAGE_SIZE]
+
+
+def recipe_list(ctx):
+    return Recipe.objects.filter(
+        user=ctx['user']
+    ).order_by('-id')[:PAGE_SIZE]
+
+
+def recipe_by_price_range(ctx):
+    return Recipe.objects.filter(
+        user=ctx['user'],
+        duration__lte=30,
+        price__lte=10
+    ).order_by('price', 'id')[:PAGE_SIZE]
+
+
+def recipe_by_tags(ctx):
+    return Recipe.objects.filter(
+        user=ctx['user'],
+        tags__id__in=ctx['tag_ids']
+    ).order_by('-id')[:PAGE_SIZE]
+
+
+def recipes_of_tag(ctx):
+    return Recipe.tags.through.objects.filter(
+        tag_id=ctx['tag_ids'][0]
+    ).values_list('recipe_id', flat=True)
+
+
+def assigned_tags_distinct(ctx):
+    return Tag.objects.filter(
+        user=ctx['user'],
+        recipe__isnull=False
+    ).order_by('-name', '-id').distinct()[:PAGE_SIZE]
+
+
+def assigned_tags_exists(ctx):
+    links = Recipe.tags.through.objects.filter(tag_id=OuterRef('pk'))
+    return Tag.objects.filter(
+        Exists(links),
+        user=ctx['user']
+    ).order_by('-name', '-id')[:PAGE_SIZE]
+
+
+def tag_autocomplete(ctx):
+    return Tag.objects.filter(
+        user=ctx['user'],
+        name__istartswith='tag 123'
+    ).annotate(
+        usage=Count('recipe')
+    ).order_by('-usage', 'name', 'id')[:10]
+
+
+SCENARIOS = {
+    'tag_list': tag_list,
+    'ingredient_list': ingredient_list,
+    'recipe_list': recipe_list,
+    'recipe_by_price_range': recipe_by_price_range,
+    'recipe_by_tags': recipe_by_tags,
+    'recipes_of_tag': recipes_of_tag,
+    'assigned_tags_distinct': assigned_tags_distinct,
+    'assigned_tags_exists': assigned_tags_exists,
+    'tag_autocomplete': tag_autocomplete,
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """
+    Django custom command to benchmark the recipe API query shapes
+
+    Seeds a dataset, then reports the EXPLAIN ANALYZE plan and median
+    latency of each scenario with and without the query shape indexes.
+    Everything runs in one transaction that is rolled back at the end
+    """
+    help = 'Benchmark the recipe API queries on a seeded dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument(
+            '--recipes', type=int, default=2000,
+            help='Recipes per user'
+        )
+        parser.add_argument(
+            '--tags', type=int, default=200,
+            help='Tags and ingredients per user'
+        )
+        parser.add_argument(
+            '--links', type=int, default=5,
+            help='Tags and ingredients linked to each recipe'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Timed runs per scenario'
+        )
+        parser.add_argument(
+            '--scenario', action='append', choices=sorted(SCENARIOS),
+            help='Scenario to run, may be repeated (default: all)'
+        )
+        parser.add_argument(
+            '--no-plans', action='store_true',
+            help='Only print latencies'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Benchmarks need a PostgreSQL database')
+
+        names = options['scenario'] or list(SCENARIOS)
+        try:
+            with transaction.atomic():
+                ctx = self.seed(options)
+                self.analyze()
+                after = self.run_scenarios(names, ctx, options)
+                self.drop_indexes()
+                self.analyze()
+                before = self.run_scenarios(names, ctx, options)
+                self.report(names, before, after, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def seed(self, options):
+        """
+        Create users with tags, ingredients and linked recipes
+        """
+        self.stdout.write('seeding benchmark data...')
+        rng = random.Random(0)
+        prefix = uuid.uuid4().hex[:8]
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f'bench-{prefix}-{i}@example.com')
+            for i in range(options['users'])
+        )
+        tag_through = Recipe.tags.through
+        ingredient_through = Recipe.ingredients.through
+        for user in users:
+            tags = Tag.objects.bulk_create(
+                (Tag(user=user, name=f'tag {i}', normalized_name=f'tag {i}')
+                 for i in range(options['tags'])),
+                batch_size=5000
+            )
+            ingredients = Ingredient.objects.bulk_create(
+                (Ingredient(user=user, name=f'ingredient {i}',
+                            normalized_name=f'ingredient {i}')
+                 for i in range(options['tags'])),
+                batch_size=5000
+            )
+            recipes = Recipe.objects.bulk_create(
+                (Recipe(user=user, title=f'recipe {i}',
+                        duration=rng.randint(5, 120),
+                        price=rng.randint(1, 50))
+                 for i in range(options['recipes'])),
+                batch_size=5000
+            )
+            links = min(options['links'], options['tags'])
+            tag_through.objects.bulk_create(
+                (tag_through(recipe_id=recipe.id, tag_id=tag.id)
+                 for recipe in recipes
+                 for tag in rng.sample(tags, links)),
+                batch_size=10000
+            )
+            ingredient_through.objects.bulk_create(
+                (ingredient_through(recipe_id=recipe.id,
+                                    ingredient_id=ingredient.id)
+                 for recipe in recipes
+                 for ingredient in rng.sample(ingredients, links)),
+                batch_size=10000
+            )
+
+        return {
+            'user': users[0],
+            'tag_ids': list(Tag.objects.filter(
+                user=users[0]
+            ).values_list('id', flat=True)[:10]),
+        }
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            for model in (Tag, Ingredient, Recipe,
+                          Recipe.tags.through, Recipe.ingredients.through):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+    def drop_indexes(self):
+        with connection.cursor() as cursor:
+            for name in QUERY_SHAPE_INDEXES:
+                cursor.execute(f'DROP INDEX IF EXISTS {name}')
+
+    def run_scenarios(self, names, ctx, options):
+        """
+        Return the plan and median latency (ms) for each scenario
+        """
+        results = {}
+        for name in names:
+            queryset = SCENARIOS[name](ctx)
+            plan = queryset.explain(analyze=True, buffers=True)
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = (plan, statistics.median(timings))
+
+        return results
+
+    def report(self, names, before, after, options):
+        for name in names:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, results in (('before', before), ('after', after)):
+                plan, median = results[name]
+                self.stdout.write(f'  {label}: {median:.2f} ms (median)')
+                if not options['no_plans']:
+                    for line in plan.splitlines():
+                        self.stdout.write(f'    {line}')
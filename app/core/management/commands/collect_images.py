@@ -0,0 +1,227 @@
+import os
+import re
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import ImageBlob, ImageUpload, Recipe, image_storage
+
+
+IMAGE_DIR = 'uploads/recipe'
+
+
+def iter_files(root):
+    """
+    Yield the file entries under root, reading one directory at a time
+    """
+    directories = [root]
+    while directories:
+        with os.scandir(directories.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    """
+    Django custom command to garbage collect recipe image files
+
+    Expires the resumable uploads idle for RECIPE_UPLOAD_EXPIRE_SECONDS
+    with their partial files, forgets image blobs nobody referenced for
+    the grace period, then walks the recipe image directory and removes
+    the files, variants included, whose image is not a blob. Files are
+    read and checked in batches so memory stays flat however many are
+    stored, and files younger than the grace period are kept for
+    uploads in flight
+    """
+    help = 'Remove expired uploads and unreferenced recipe image files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Files or blobs checked per query'
+        )
+        parser.add_argument(
+            '--grace', type=int, default=3600,
+            help='Seconds an unreferenced file is kept for'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report what would be removed'
+        )
+
+    def handle(self, *args, **options):
+        variants = '|'.join(map(re.escape, settings.RECIPE_IMAGE_VARIANTS))
+        # Variant names, with the suffix storage added on name clashes
+        self.variant_re = re.compile(
+            rf'^(?P<base>.+)_(?P<variant>{variants})'
+            rf'(?P<suffix>_[A-Za-z0-9]{{7}})?\.[^./]+$'
+        )
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        uploads = self.collect_uploads(options)
+        self.stdout.write(f'{verb} {uploads} expired uploads')
+        blobs = self.collect_blobs(options)
+        self.stdout.write(f'{verb} {blobs} unreferenced image blobs')
+        files, size = self.collect_files(options)
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {files} orphaned files ({size} bytes)'
+        ))
+
+    def collect_uploads(self, options):
+        """
+        Delete the uploads left idle past their expiry, their partial
+        files are removed by the delete signal
+        """
+        stale = ImageUpload.objects.filter(
+            updated_at__lt=timezone.now() - timedelta(
+                seconds=settings.RECIPE_UPLOAD_EXPIRE_SECONDS
+            )
+        )
+        if options['dry_run']:
+            return stale.count()
+
+        removed = 0
+        while True:
+            ids = list(stale.values_list('pk', flat=True)[
+                :options['batch_size']
+            ])
+            if not ids:
+                return removed
+            removed += ImageUpload.objects.filter(pk__in=ids).delete()[0]
+
+    def collect_blobs(self, options):
+        """
+        Delete the blobs left without references for the grace period
+        """
+        stale = ImageBlob.objects.filter(
+            refcount=0,
+            updated_at__lt=timezone.now() - timedelta(
+                seconds=options['grace']
+            )
+        )
+        if options['dry_run']:
+            return stale.count()
+
+        removed = 0
+        while True:
+            with transaction.atomic():
+                # Blobs being retained meanwhile are locked and skipped
+                ids = list(stale.select_for_update(
+                    skip_locked=True
+                ).values_list('pk', flat=True)[:options['batch_size']])
+                if not ids:
+                    return removed
+                removed += ImageBlob.objects.filter(
+                    pk__in=ids,
+                    refcount=0
+                ).delete()[0]
+
+    def collect_files(self, options):
+        """
+        Delete the image files none of the blobs or recipes refer to
+        """
+        root = image_storage.path(IMAGE_DIR)
+        if not os.path.isdir(root):
+            return 0, 0
+
+        cutoff = time.time() - options['grace']
+        old_files = (entry for entry in iter_files(root)
+                     if entry.stat().st_mtime < cutoff)
+        removed = size = 0
+        for batch in batched(old_files, options['batch_size']):
+            names = {
+                os.path.relpath(entry.path, image_storage.location)
+                .replace(os.sep, '/'): entry
+                for entry in batch
+            }
+            kept = self.kept_names(names)
+            for name, entry in names.items():
+                if name in kept:
+                    continue
+                size += entry.stat().st_size
+                removed += 1
+                if not options['dry_run']:
+                    image_storage.delete(name)
+
+        return removed, size
+
+    def image_base(self, name):
+        """
+        Return the name of an image or variant without its extension
+        and variant suffix
+        """
+        match = self.variant_re.match(name)
+        if match:
+            return match.group('base')
+
+        return os.path.splitext(name)[0]
+
+    def kept_names(self, names):
+        """
+        Return the names of the images and variants still in use
+        """
+        referenced = self.referenced_bases(names)
+        kept = set()
+        copies = {}
+        for name in names:
+            if self.image_base(name) not in referenced:
+                continue
+            match = self.variant_re.match(name)
+            if match and match.group('suffix'):
+                copies.setdefault(match.group('variant'), []).append(name)
+            else:
+                kept.add(name)
+        if copies:
+            kept.update(self.referenced_copies(copies))
+
+        return kept
+
+    def referenced_copies(self, copies):
+        """
+        Return which suffixed variant copies a recipe still refers to
+
+        Image jobs racing on the same image used to save such copies,
+        the recipes they finished for use them until processed again
+        """
+        condition = Q()
+        for variant, names in copies.items():
+            condition |= Q(**{f'image_variants__{variant}__in': names})
+        names = {name for names in copies.values() for name in names}
+        referenced = set()
+        for variants in Recipe.objects.filter(condition).values_list(
+            'image_variants', flat=True
+        ):
+            referenced.update(name for name in variants.values()
+                              if name in names)
+
+        return referenced
+
+    def referenced_bases(self, names):
+        """
+        Return which bases of the names belong to an image blob
+
+        Recipe images all hold a reference on their blob, which is kept
+        until the grace period after the last one is released
+        """
+        bases = {self.image_base(name) for name in names}
+
+        return set(ImageBlob.objects.filter(
+            base__in=bases
+        ).values_list('base', flat=True))
@@ -0,0 +1,312 @@
+import io
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import namedtuple
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urlsplit
+
+from PIL import Image
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+RECIPES_PATH = '/api/recipe/recipes/'
+
+# Request body sent as is
+Form = namedtuple('Form', 'content_type body')
+
+SEARCH_WORDS = ('soup', 'curry', 'cake', 'salad', 'stew')
+
+
+def recipe_list(ctx, rng):
+    return 'GET', f'{RECIPES_PATH}?page_size=50', None
+
+
+def recipe_detail(ctx, rng):
+    return 'GET', f'{RECIPES_PATH}{rng.choice(ctx["recipe_ids"])}/', None
+
+
+def recipe_filter(ctx, rng):
+    return 'GET', (
+        f'{RECIPES_PATH}?duration__lte={rng.randint(10, 60)}'
+        f'&price__lte={rng.randint(5, 50)}&ordering=price'
+    ), None
+
+
+def recipe_search(ctx, rng):
+    return 'GET', f'{RECIPES_PATH}?q={rng.choice(SEARCH_WORDS)}', None
+
+
+def recipe_stats(ctx, rng):
+    return 'GET', f'{RECIPES_PATH}stats/', None
+
+
+def tag_list(ctx, rng):
+    return 'GET', '/api/recipe/tags/', None
+
+
+def recipe_create(ctx, rng):
+    return 'POST', RECIPES_PATH, {
+        'title': f'{rng.choice(SEARCH_WORDS)} {rng.randint(0, 10 ** 6)}',
+        'duration': rng.randint(5, 120),
+        'price': rng.randint(1, 50),
+        'tags': rng.sample(ctx['tag_ids'], 2),
+        'ingredients': [],
+    }
+
+
+def recipe_image(ctx, rng):
+    return 'POST', (
+        f'{RECIPES_PATH}{rng.choice(ctx["recipe_ids"])}/upload-image/'
+    ), ctx['image_form']
+
+
+SCENARIOS = {
+    'recipe_list': recipe_list,
+    'recipe_detail': recipe_detail,
+    'recipe_filter': recipe_filter,
+    'recipe_search': recipe_search,
+    'recipe_stats': recipe_stats,
+    'tag_list': tag_list,
+    'recipe_create': recipe_create,
+    # Last, the uploads keep the image workers busy for a while
+    'recipe_image': recipe_image,
+}
+
+
+def sample_image(size=(800, 600)):
+    """
+    Return a JPEG of noise, which compresses about as badly as a photo
+    """
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 64).convert('RGB').save(buffer, 'JPEG')
+
+    return buffer.getvalue()
+
+
+def encode_multipart(data):
+    """
+    Return a multipart form of files, as {field: (filename, content)}
+    """
+    boundary = uuid.uuid4().hex
+    body = b''
+    for field, (filename, content) in data.items():
+        body += (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field}"; '
+            f'filename="{filename}"\r\n\r\n'
+        ).encode() + content + b'\r\n'
+
+    return Form(
+        f'multipart/form-data; boundary={boundary}',
+        body + f'--{boundary}--\r\n'.encode()
+    )
+
+
+class Client:
+    """
+    Keep alive HTTP connection to the server under test
+    """
+
+    def __init__(self, url, token=None):
+        parts = urlsplit(url)
+        connection_class = (
+            HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+        )
+        self.connection = connection_class(parts.netloc, timeout=30)
+        self.token = token
+
+    def request(self, method, path, data=None):
+        """
+        Return the status and decoded JSON body of a request
+        """
+        headers = {'Accept': 'application/json'}
+        body = None
+        if isinstance(data, Form):
+            headers['Content-Type'], body = data
+        elif data is not None:
+            body = json.dumps(data)
+            headers['Content-Type'] = 'application/json'
+        if self.token:
+            headers['Authorization'] = f'Token {self.token}'
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, ConnectionError):
+            # Reconnect on the next request
+            self.connection.close()
+            raise
+
+        return response.status, json.loads(content) if content else None
+
+    def close(self):
+        self.connection.close()
+
+
+class Command(BaseCommand):
+    """
+    Django custom command to load test the recipe endpoints over HTTP
+
+    Signs up a throwaway user with seeded recipes, then runs each
+    scenario for a fixed duration from concurrent keep alive clients
+    and reports its throughput and latency percentiles. Point it at the
+    production profile (docker-compose.prod.yml) to measure the served
+    configuration rather than runserver, with app.wsgi or app.asgi
+    (GUNICORN_WORKER_CLASS) to compare the sync and async views
+    """
+    help = 'Load test the recipe API of a running server'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='http://localhost:8000',
+            help='Base URL of the server under test'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=16,
+            help='Concurrent clients'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=20,
+            help='Seconds each scenario runs'
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=500,
+            help='Recipes seeded for the test user'
+        )
+        parser.add_argument(
+            '--scenario', action='append', choices=sorted(SCENARIOS),
+            help='Scenario to run, may be repeated (default: all)'
+        )
+
+    def handle(self, *args, **options):
+        ctx = self.seed(options)
+        names = options['scenario'] or list(SCENARIOS)
+        self.stdout.write(
+            f'{"scenario":<16}{"requests":>10}{"errors":>8}{"req/s":>10}'
+            f'{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+        )
+        for name in names:
+            results = self.run_scenario(name, ctx, options)
+            self.report(name, results, options['duration'])
+
+    def seed(self, options):
+        """
+        Sign up a test user and bulk create their tags and recipes
+        """
+        url = options['url']
+        client = Client(url)
+        email = f'load-{uuid.uuid4().hex[:12]}@example.com'
+        password = uuid.uuid4().hex
+        try:
+            client.request('POST', '/api/account/account-create/', {
+                'email': email, 'password': password, 'name': 'Load test',
+            })
+            status, data = client.request(
+                'POST', '/api/account/account-token/',
+                {'email': email, 'password': password}
+            )
+        except (OSError, ConnectionError) as exc:
+            raise CommandError(f'Cannot reach {url}: {exc}')
+        finally:
+            client.close()
+        if status != 200:
+            raise CommandError(f'Could not sign up a test user: {data}')
+
+        client = Client(url, data['token'])
+        rng = random.Random(0)
+        try:
+            _, data = client.request(
+                'POST', '/api/recipe/tags/bulk/',
+                [{'name': f'tag {i}'} for i in range(20)]
+            )
+            tag_ids = [tag['id'] for tag in data['results']]
+            recipe_ids = []
+            for start in range(0, options['recipes'], 500):
+                count = min(500, options['recipes'] - start)
+                _, data = client.request('POST', f'{RECIPES_PATH}bulk/', [
+                    {
+                        'title': f'{rng.choice(SEARCH_WORDS)} {start + i}',
+                        'duration': rng.randint(5, 120),
+                        'price': rng.randint(1, 50),
+                        'tags': rng.sample(tag_ids, 2),
+                        'ingredients': [],
+                    }
+                    for i in range(count)
+                ])
+                recipe_ids += [recipe['id'] for recipe in data['results']]
+        finally:
+            client.close()
+        self.stdout.write(
+            f'seeded {len(recipe_ids)} recipes for {email}'
+        )
+
+        return {
+            'url': url,
+            'token': client.token,
+            'tag_ids': tag_ids,
+            'recipe_ids': recipe_ids or [0],
+            'image_form': encode_multipart({
+                'image': ('image.jpg', sample_image())
+            }),
+        }
+
+    def run_scenario(self, name, ctx, options):
+        """
+        Return the latencies (ms) and error count of a scenario run
+        """
+        deadline = time.monotonic() + options['duration']
+        latencies = []
+        errors = [0]
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            client = Client(ctx['url'], ctx['token'])
+            local_latencies = []
+            local_errors = 0
+            try:
+                while time.monotonic() < deadline:
+                    method, path, data = SCENARIOS[name](ctx, rng)
+                    start = time.perf_counter()
+                    try:
+                        status, _ = client.request(method, path, data)
+                    except (OSError, ConnectionError, ValueError):
+                        status = None
+                    local_latencies.append(
+                        (time.perf_counter() - start) * 1000
+                    )
+                    if status is None or status >= 400:
+                        local_errors += 1
+            finally:
+                client.close()
+            with lock:
+                latencies.extend(local_latencies)
+                errors[0] += local_errors
+
+        threads = [threading.Thread(target=worker, args=(seed,))
+                   for seed in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return latencies, errors[0]
+
+    def report(self, name, results, duration):
+        latencies, errors = results
+        ranked = sorted(latencies) or [0]
+        # Nearest rank percentiles
+        p50, p95, p99 = (
+            ranked[math.ceil(len(ranked) * rank / 100) - 1]
+            for rank in (50, 95, 99)
+        )
+        self.stdout.write(
+            f'{name:<16}{len(latencies):>10}{errors:>8}'
+            f'{len(latencies) / duration:>10.1f}'
+            f'{p50:>9.2f}{p95:>9.2f}{p99:>9.2f}'
+        )
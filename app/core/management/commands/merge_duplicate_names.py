@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+
+from core.dedupe import merge_duplicates
+from core.models import Tag, Ingredient, Recipe
+from recipe.cache import invalidate_user
+from recipe.signals import touch_recipes
+
+
+# Deduplicated model with the recipe field linking it
+MODELS = {
+    'tags': Tag,
+    'ingredients': Ingredient,
+}
+
+
+class Command(BaseCommand):
+    """
+    Django custom command to merge duplicate tags and ingredients
+
+    Objects of a user sharing a normalized name are merged into the
+    oldest one, moving their recipe links onto it. Groups are merged a
+    batch at a time, each batch in its own transaction, so the command
+    can be stopped and run again at any point. The relinked recipes are
+    touched and their users' cached responses invalidated as the recipe
+    signals would
+    """
+    help = 'Merge tags and ingredients whose names only differ by case ' \
+           'or spacing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Duplicate groups merged per transaction'
+        )
+        parser.add_argument(
+            '--model', action='append', choices=sorted(MODELS),
+            help='Model to deduplicate, may be repeated (default: all)'
+        )
+
+    def handle(self, *args, **options):
+        for field_name in options['model'] or list(MODELS):
+            field = Recipe._meta.get_field(field_name)
+            total = 0
+            for merged, (user_id, name) in merge_duplicates(
+                MODELS[field_name],
+                field.remote_field.through,
+                f'{field.m2m_reverse_field_name()}_id',
+                batch_size=options['batch_size'],
+                on_merge=self.refresh_merged
+            ):
+                total += merged
+                self.stdout.write(
+                    f'{field_name}: merged {merged} duplicates, '
+                    f'up to user {user_id} "{name}"'
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f'{field_name}: {total} duplicates merged'
+            ))
+
+    def refresh_merged(self, recipe_ids, user_ids):
+        """
+        Refresh the recipes and cached responses a merge changed
+        """
+        touch_recipes(Recipe.objects.filter(pk__in=recipe_ids))
+        for user_id in user_ids:
+            invalidate_user(user_id)
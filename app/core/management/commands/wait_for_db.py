@@ -1,22 +1,85 @@
+import random
 import time
 
-from django.db import connections
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """
     Django custom command to pause execution until database is available
+
+    The database is ready once a connection opens, and with --migrations
+    once another process applied every migration. Attempts back off
+    exponentially, with jitter so starting containers do not retry in
+    step, and give up after --timeout seconds
     """
+    help = 'Wait until the database accepts connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database to wait for'
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Seconds to wait before failing'
+        )
+        parser.add_argument(
+            '--initial-delay', type=float, default=0.1,
+            help='Seconds before the first retry, doubled on each one'
+        )
+        parser.add_argument(
+            '--max-delay', type=float, default=5,
+            help='Longest wait between retries'
+        )
+        parser.add_argument(
+            '--migrations', action='store_true',
+            help='Wait for pending migrations to be applied as well'
+        )
 
     def handle(self, *args, **options):
         self.stdout.write('waiting for database...')
-        db_conn = None
-        while not db_conn:
+        connection = connections[options['database']]
+        deadline = time.monotonic() + options['timeout']
+        delay = options['initial_delay']
+        while True:
             try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
+                reason = self.not_ready(connection, options['migrations'])
+            except OperationalError as exc:
+                # psycopg2 adds hints on the following lines
+                reason = str(exc).strip().split('\n')[0] or 'no connection'
+            if reason is None:
+                break
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise CommandError(
+                    f'Database unavailable after {options["timeout"]}s: '
+                    f'{reason}'
+                )
+            wait = min(random.uniform(delay / 2, delay), remaining)
+            self.stdout.write(
+                f'Database unavailable ({reason}), waiting {wait:.2f}s...'
+            )
+            time.sleep(wait)
+            delay = min(delay * 2, options['max_delay'])
+
         self.stdout.write(self.style.SUCCESS('Database available!'))
+
+    def not_ready(self, connection, migrations):
+        """
+        Return why the database is not ready yet, or None
+        """
+        connection.ensure_connection()
+        if migrations:
+            executor = MigrationExecutor(connection)
+            plan = executor.migration_plan(
+                executor.loader.graph.leaf_nodes()
+            )
+            if plan:
+                return f'{len(plan)} migrations pending'
+
+        return None
@@ -0,0 +1,50 @@
+# Generated by Django 3.1.14 on 2026-10-18 02:54
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+def count_existing_images(apps, schema_editor):
+    """
+    Start the reference counts of the images stored so far
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    ImageBlob = apps.get_model('core', 'ImageBlob')
+    db_alias = schema_editor.connection.alias
+    references = Recipe.objects.using(db_alias).exclude(image='').exclude(
+        image__isnull=True
+    ).values('image').annotate(refcount=models.Count('id')).order_by()
+    ImageBlob.objects.using(db_alias).bulk_create(
+        (ImageBlob(name=row['image'], refcount=row['refcount'])
+         for row in references.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_image_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.RunPython(
+            count_existing_images,
+            migrations.RunPython.noop
+        ),
+    ]
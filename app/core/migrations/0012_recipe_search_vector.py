@@ -0,0 +1,64 @@
+# Generated by Django 3.1.14 on 2026-10-18 02:57
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+# Title, tag names and ingredient names weighted A, B and C, the same
+# vector recipe.search.search_vector() builds
+BACKFILL_SQL = '''
+UPDATE core_recipe SET search_vector =
+    setweight(to_tsvector(%(config)s, coalesce(title, '')), 'A') ||
+    setweight(to_tsvector(%(config)s, coalesce((
+        SELECT string_agg(core_tag.name, ' ')
+        FROM core_recipe_tags
+        JOIN core_tag ON core_tag.id = core_recipe_tags.tag_id
+        WHERE core_recipe_tags.recipe_id = core_recipe.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%(config)s, coalesce((
+        SELECT string_agg(core_ingredient.name, ' ')
+        FROM core_recipe_ingredients
+        JOIN core_ingredient
+            ON core_ingredient.id = core_recipe_ingredients.ingredient_id
+        WHERE core_recipe_ingredients.recipe_id = core_recipe.id
+    ), '')), 'C')
+'''
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Index and fill the search vectors, on PostgreSQL only where the
+    search runs against them
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX core_recipe_search_idx '
+        'ON core_recipe USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        BACKFILL_SQL,
+        {'config': settings.RECIPE_SEARCH_CONFIG}
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX core_recipe_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_image_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
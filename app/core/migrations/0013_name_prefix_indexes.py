@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+# Case insensitive prefix lookups (name__istartswith compiles to
+# UPPER(name::text) LIKE UPPER('prefix%')) scan a range of these
+PREFIX_INDEXES = (
+    ('core_tag_user_name_prefix_idx', 'core_tag'),
+    ('core_ingredient_user_name_prefix_idx', 'core_ingredient'),
+)
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table in PREFIX_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX {name} '
+            f'ON {table} (user_id, upper(name) text_pattern_ops)'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in PREFIX_INDEXES:
+        schema_editor.execute(f'DROP INDEX {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+from core.models import normalize_name
+
+
+def fill_normalized_names(apps, schema_editor):
+    """
+    Normalize the names stored so far, a batch at a time
+    """
+    db_alias = schema_editor.connection.alias
+    for model_name in ('Tag', 'Ingredient'):
+        objects = apps.get_model('core', model_name).objects.using(db_alias)
+        batch = []
+        for obj in objects.only('id', 'name').iterator(chunk_size=1000):
+            obj.normalized_name = normalize_name(obj.name)
+            batch.append(obj)
+            if len(batch) == 1000:
+                objects.bulk_update(batch, ['normalized_name'])
+                batch = []
+        objects.bulk_update(batch, ['normalized_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_name_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_normalized_names, migrations.RunPython.noop),
+    ]
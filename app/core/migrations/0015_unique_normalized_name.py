@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+from core.dedupe import merge_duplicates
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """
+    Merge the duplicates left so the constraints can be added
+
+    On large databases run the merge_duplicate_names command first,
+    this then finds nothing to do
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field_name in (('Tag', 'tags'),
+                                   ('Ingredient', 'ingredients')):
+        field = Recipe._meta.get_field(field_name)
+        for _ in merge_duplicates(
+            apps.get_model('core', model_name),
+            field.remote_field.through,
+            f'{field.m2m_reverse_field_name()}_id',
+            using=schema_editor.connection.alias
+        ):
+            pass
+
+
+class Migration(migrations.Migration):
+    # Each batch of merged duplicates commits on its own
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_normalized_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'normalized_name'), name='core_ingredient_user_normalized_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'normalized_name'), name='core_tag_user_normalized_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.1.14 on 2026-10-18 03:11
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def summarize_existing_recipes(apps, schema_editor):
+    """
+    Start the recipe totals of the users created so far
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    RecipeSummary = apps.get_model('core', 'RecipeSummary')
+    db_alias = schema_editor.connection.alias
+    users = User.objects.using(db_alias).annotate(
+        recipe_count=models.Count('recipe'),
+        price_total=Coalesce(models.Sum('recipe__price'), 0),
+        duration_total=Coalesce(models.Sum('recipe__duration'), 0)
+    ).values_list('pk', 'recipe_count', 'price_total', 'duration_total')
+    RecipeSummary.objects.using(db_alias).bulk_create(
+        (RecipeSummary(user_id=pk, recipe_count=count, price_total=price,
+                       duration_total=duration)
+         for pk, count, price, duration in users.order_by().iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_recipe_range_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.PositiveIntegerField(default=0)),
+                ('price_total', models.BigIntegerField(default=0)),
+                ('duration_total', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(
+            summarize_existing_recipes,
+            migrations.RunPython.noop
+        ),
+    ]
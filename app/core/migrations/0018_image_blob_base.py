@@ -0,0 +1,41 @@
+# Generated by Django 3.1.14 on 2026-10-18 09:12
+
+import os
+
+from django.db import migrations, models
+
+
+def fill_image_bases(apps, schema_editor):
+    """
+    Store the base of the image blobs created so far
+    """
+    ImageBlob = apps.get_model('core', 'ImageBlob')
+    db_alias = schema_editor.connection.alias
+    blobs = []
+    for blob in ImageBlob.objects.using(db_alias).only('name').iterator():
+        blob.base = os.path.splitext(blob.name)[0]
+        blobs.append(blob)
+        if len(blobs) == 1000:
+            ImageBlob.objects.using(db_alias).bulk_update(blobs, ['base'])
+            blobs = []
+    ImageBlob.objects.using(db_alias).bulk_update(blobs, ['base'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_recipe_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageblob',
+            name='base',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(
+            fill_image_bases,
+            migrations.RunPython.noop
+        ),
+    ]
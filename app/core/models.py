@@ -1,6 +1,9 @@
 import uuid
 import os
+from collections import Counter
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -10,6 +13,12 @@ from django.contrib.auth.models import (
 
 from django.conf import settings
 
+from core.storage import ContentAddressedStorage
+
+
+# Identical recipe images are stored once, see ImageBlob
+image_storage = ContentAddressedStorage()
+
 
 def recipe_image_file_path(instance, filename):
     """
@@ -21,6 +30,29 @@ def recipe_image_file_path(instance, filename):
     return os.path.join('uploads/recipe/', filename)
 
 
+def normalize_name(name):
+    """
+    Return the form of a tag/ingredient name compared for duplicates
+    """
+    return ' '.join(name.split()).casefold()
+
+
+class NormalizedNameMixin:
+    """
+    Keep normalized_name in step with name on save
+    """
+
+    def normalize_name(self):
+        self.normalized_name = normalize_name(self.name)
+
+    def save(self, *args, **kwargs):
+        self.normalize_name()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_name'}
+        super().save(*args, **kwargs)
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email, password=None, **extra_fields):
@@ -67,29 +99,65 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         verbose_name_plural = 'Users'
 
 
-class Tag(models.Model):
+class Tag(NormalizedNameMixin, models.Model):
     """
     Tag model to be used for a recipe tagging
     """
     name = models.CharField(max_length=255)
+    # Trimmed, single spaced and case folded name, unique per user
+    normalized_name = models.CharField(max_length=255, editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Per user listing ordered by -name, -id
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_tag_user_name_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'normalized_name'],
+                name='core_tag_user_normalized_name_uniq'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Ingredient(models.Model):
+class Ingredient(NormalizedNameMixin, models.Model):
     """
     Ingredient model to be used in a recipe
     """
     name = models.CharField(max_length=255)
+    # Trimmed, single spaced and case folded name, unique per user
+    normalized_name = models.CharField(max_length=255, editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Per user listing ordered by -name, -id
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_ingredient_user_name_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'normalized_name'],
+                name='core_ingredient_user_normalized_name_uniq'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -99,6 +167,17 @@ class Recipe(models.Model):
     """
     Recipe object model
     """
+    IMAGE_PENDING = 'pending'
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -111,8 +190,201 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(
         null=True,
-        upload_to=recipe_image_file_path
+        upload_to=recipe_image_file_path,
+        storage=image_storage
     )
+    image_status = models.CharField(
+        max_length=16,
+        choices=IMAGE_STATUS_CHOICES,
+        blank=True
+    )
+    # Resized renditions of the image, file name by variant name
+    image_variants = models.JSONField(default=dict, blank=True)
+    # Title, tag and ingredient names, maintained by the recipe signals
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Per user listing and cursor pagination ordered by -id
+            models.Index(
+                fields=['user', 'id'],
+                name='core_recipe_user_id_idx'
+            ),
+            # Range filters and sorts on price and duration, id breaks
+            # ties in the cursor order
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='core_recipe_user_price_idx'
+            ),
+            models.Index(
+                fields=['user', 'duration', 'id'],
+                name='core_recipe_user_duration_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RecipeSummaryManager(models.Manager):
+
+    def add(self, user_id, recipes=0, price=0, duration=0):
+        """
+        Add to the recipe totals of a user
+        """
+        if recipes or price or duration:
+            self.filter(user_id=user_id).update(
+                recipe_count=models.F('recipe_count') + recipes,
+                price_total=models.F('price_total') + price,
+                duration_total=models.F('duration_total') + duration
+            )
+
+    def recount(self, user_id):
+        """
+        Recompute the recipe totals of a user from their recipes
+        """
+        self.filter(user_id=user_id).update(**recipe_totals(user_id))
+
+    def totals(self, user_id):
+        """
+        Return the recipe totals of a user, computed from their recipes
+        when they have no summary
+        """
+        summary = self.filter(user_id=user_id).values(
+            'recipe_count', 'price_total', 'duration_total'
+        ).first()
+
+        return summary or recipe_totals(user_id)
+
+
+def recipe_totals(user_id):
+    """
+    Return the number of recipes of a user and their price and
+    duration sums
+    """
+    return Recipe.objects.filter(user_id=user_id).aggregate(
+        recipe_count=models.Count('id'),
+        price_total=Coalesce(models.Sum('price'), 0),
+        duration_total=Coalesce(models.Sum('duration'), 0)
+    )
+
+
+class RecipeSummary(models.Model):
+    """
+    Recipe totals of a user, kept up to date by the recipe app signals
+    so statistics are read without scanning their recipes
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recipe_summary'
+    )
+    recipe_count = models.PositiveIntegerField(default=0)
+    price_total = models.BigIntegerField(default=0)
+    duration_total = models.BigIntegerField(default=0)
+
+    objects = RecipeSummaryManager()
+
+    def __str__(self):
+        return f'{self.user_id}: {self.recipe_count} recipes'
+
+
+class ImageBlobManager(models.Manager):
+
+    def retain(self, name):
+        """
+        Count one more reference to a stored image file
+        """
+        references = self.filter(name=name)
+        increment = {
+            'refcount': models.F('refcount') + 1,
+            'updated_at': timezone.now(),
+        }
+        if not references.update(**increment):
+            _, created = self.get_or_create(
+                name=name,
+                defaults={'refcount': 1}
+            )
+            if not created:
+                references.update(**increment)
+
+    def release(self, name):
+        """
+        Count one less reference to a stored image file
+
+        Unreferenced files are left to the collect_images command, which
+        only removes them after a grace period
+        """
+        self.filter(name=name, refcount__gt=0).update(
+            refcount=models.F('refcount') - 1,
+            updated_at=timezone.now()
+        )
+
+    def release_many(self, names):
+        """
+        Count one less reference per occurrence of each name, with one
+        query per distinct number of occurrences
+        """
+        names_by_count = {}
+        for name, count in Counter(names).items():
+            names_by_count.setdefault(count, []).append(name)
+        for count, group in names_by_count.items():
+            self.filter(name__in=group, refcount__gt=0).update(
+                refcount=Greatest(models.F('refcount') - count, 0),
+                updated_at=timezone.now()
+            )
+
+
+class ImageBlob(models.Model):
+    """
+    Stored image file shared by the recipes using the same bytes
+    """
+    name = models.CharField(max_length=255, unique=True)
+    # Name without its extension, which the variant files start with
+    base = models.CharField(max_length=255, db_index=True, editable=False)
+    refcount = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ImageBlobManager()
+
+    def __str__(self):
+        return f'{self.name} ({self.refcount})'
+
+    def save(self, *args, **kwargs):
+        self.base = os.path.splitext(self.name)[0]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'base'}
+        super().save(*args, **kwargs)
+
+
+class ImageUpload(models.Model):
+    """
+    Resumable upload of a recipe image, assembled on disk chunk by chunk
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE
+    )
+    # Total size announced by the client and bytes received so far
+    length = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def path(self):
+        """
+        Path of the partial file outside of the served media
+        """
+        return os.path.join(settings.RECIPE_UPLOAD_DIR, f'{self.id}.part')
+
+    def __str__(self):
+        return f'{self.id} ({self.offset}/{self.length})'
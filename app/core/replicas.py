@@ -0,0 +1,97 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+
+# Database alias the reads of the current request are routed to, unset
+# outside of replica reads
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def read_alias():
+    """
+    Return the replica the current reads are routed to, if any
+    """
+    return _read_alias.get()
+
+
+def _pin_key(user_id):
+    return f'db-pin:{user_id}'
+
+
+def pin_user(user_id):
+    """
+    Route a user's reads to the primary until the replicas have caught
+    up with their write
+    """
+    caches[settings.DATABASE_REPLICA_CACHE_ALIAS].set(
+        _pin_key(user_id),
+        True,
+        timeout=settings.DATABASE_REPLICA_PIN_SECONDS
+    )
+
+
+def is_pinned(user_id):
+    return caches[settings.DATABASE_REPLICA_CACHE_ALIAS].get(
+        _pin_key(user_id),
+        False
+    )
+
+
+class ReplicaRouter:
+    """
+    Send the reads of replica requests to their replica, everything
+    else to the primary
+
+    Reads inside a transaction on the primary stay on it, they have to
+    see its uncommitted writes
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+
+class ReplicaReadMixin:
+    """
+    Serve the safe requests of a view from a random replica
+
+    A user writing through one of these views is pinned to the primary
+    for DATABASE_REPLICA_PIN_SECONDS, so their next reads see the write
+    whatever the replication lag
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        user_id = request.user.pk
+        if request.method not in SAFE_METHODS:
+            if user_id is not None:
+                pin_user(user_id)
+        elif settings.DATABASE_REPLICAS and not (
+            user_id is not None and is_pinned(user_id)
+        ):
+            self._read_alias_token = _read_alias.set(
+                random.choice(settings.DATABASE_REPLICAS)
+            )
+
+    def dispatch(self, request, *args, **kwargs):
+        self._read_alias_token = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._read_alias_token is not None:
+                _read_alias.reset(self._read_alias_token)
@@ -0,0 +1,43 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage naming files after the sha256 of their bytes
+
+    Files keep the directory and extension of the name they are saved
+    under, sharded by the first two hex digits of the digest. Saving
+    bytes that are already stored returns the existing name without
+    writing them again
+    """
+
+    def content_name(self, name, content):
+        """
+        Return the content addressed name of a file about to be saved
+        """
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+
+        return os.path.join(directory, digest[:2], f'{digest}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.exists(name):
+            # Renew the mtime so the garbage collection grace period
+            # covers the new reference as well
+            os.utime(self.path(name))
+            return name
+
+        return super().save(name, content, max_length=max_length)
@@ -0,0 +1,198 @@
+import contextvars
+import io
+import json
+import threading
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core import async_views
+from core.async_views import AsyncURLConfHandler, run_in_pool
+from core.models import Recipe
+
+
+_request_id = contextvars.ContextVar('request_id')
+
+
+def asgi_scope(method, path, query_string='', headers=()):
+    return {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query_string.encode(),
+        'headers': [(b'host', b'testserver'), *headers],
+        'server': ('testserver', 80),
+    }
+
+
+class RunInPoolTests(SimpleTestCase):
+
+    async def test_runs_on_pool_with_context(self):
+        """
+        Test functions run on the async view threads with the context
+        variables of the caller
+        """
+        _request_id.set(42)
+
+        thread_name, request_id = await run_in_pool(
+            lambda: (threading.current_thread().name, _request_id.get())
+        )
+
+        self.assertTrue(thread_name.startswith('async-view'))
+        self.assertEqual(request_id, 42)
+
+    async def test_expires_connections(self):
+        """
+        Test connections of the pool threads are expired around each job
+        """
+        with patch('core.async_views.close_old_connections') as close, \
+                self.assertRaises(ValueError):
+            await run_in_pool(int, 'not a number')
+
+        self.assertEqual(close.call_count, 2)
+
+    @override_settings(ASGI_URLCONF='app.asgi_urls')
+    def test_handler_resolves_with_asgi_urlconf(self):
+        """
+        Test the ASGI handler resolves requests with ASGI_URLCONF
+        """
+        request, _ = AsyncURLConfHandler().create_request(
+            asgi_scope('GET', '/api/recipe/recipes/'), io.BytesIO()
+        )
+
+        self.assertEqual(request.urlconf, 'app.asgi_urls')
+
+
+class AsyncRecipeViewTests(TransactionTestCase):
+    """
+    Test the recipe views served by app.asgi
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Close the connections of the pool threads after each request,
+        # none are left to the test database
+        cls.conn_max_age = patch.dict(connections.databases['default'],
+                                      CONN_MAX_AGE=0)
+        cls.conn_max_age.start()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.conn_max_age.stop()
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Green curry',
+            duration=20,
+            price=8
+        )
+        self.handler = AsyncURLConfHandler()
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        for name in self.recipe.image_variants.values():
+            default_storage.delete(name)
+        self.recipe.image.delete()
+
+    async def request(self, method, path, query_string='', body=b'',
+                      content_type=None):
+        """
+        Return the status and body of a request to the ASGI handler
+        """
+        headers = [
+            (b'authorization', f'Token {self.token.key}'.encode()),
+            (b'content-length', str(len(body)).encode()),
+        ]
+        if content_type:
+            headers.append((b'content-type', content_type.encode()))
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': body}
+
+        async def send(message):
+            messages.append(message)
+
+        await self.handler(
+            asgi_scope(method, path, query_string, headers), receive, send
+        )
+
+        return messages[0]['status'], b''.join(
+            message.get('body', b'') for message in messages[1:]
+        )
+
+    async def test_list_and_retrieve(self):
+        """
+        Test listing and retrieving recipes runs on the async view
+        threads
+        """
+        with patch('core.async_views._run_job',
+                   wraps=async_views._run_job) as run_job:
+            status_code, body = await self.request(
+                'GET', reverse('recipe:recipe-list')
+            )
+            self.assertEqual(status_code, 200)
+            self.assertEqual(
+                [recipe['title'] for recipe in json.loads(body)['results']],
+                ['Green curry']
+            )
+
+            status_code, body = await self.request(
+                'GET', reverse('recipe:recipe-detail', args=[self.recipe.pk])
+            )
+            self.assertEqual(status_code, 200)
+            self.assertEqual(json.loads(body)['price'], 8)
+
+        self.assertEqual(run_job.call_count, 2)
+
+    @override_settings(RECIPE_IMAGE_WORKERS=0)
+    async def test_upload_image(self):
+        """
+        Test uploading a recipe image through the async view
+        """
+        image = io.BytesIO()
+        Image.new('RGB', (10, 10)).save(image, format='JPEG')
+        image.name = 'image.jpg'
+        image.seek(0)
+
+        status_code, body = await self.request(
+            'POST',
+            reverse('recipe:recipe-upload-image', args=[self.recipe.pk]),
+            body=encode_multipart(BOUNDARY, {'image': image}),
+            content_type=MULTIPART_CONTENT
+        )
+
+        self.assertEqual(status_code, 202)
+        self.assertEqual(json.loads(body)['image_status'], Recipe.IMAGE_READY)
+
+    async def test_export_streams(self):
+        """
+        Test streamed responses are iterated off the event loop, where
+        their queries would fail
+        """
+        status_code, body = await self.request(
+            'GET', reverse('recipe:recipe-export')
+        )
+
+        self.assertEqual(status_code, 200)
+        self.assertEqual(
+            [json.loads(line)['title'] for line in body.splitlines()],
+            ['Green curry']
+        )
@@ -1,8 +1,19 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core.models import ImageBlob, ImageUpload, Recipe, Tag
+from recipe.cache import get_user_version
 
 
 class CommandTests(TestCase):
@@ -11,16 +22,242 @@ class CommandTests(TestCase):
         """
         Test waiting for db to check if database is available
         """
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        with patch.object(connection, 'ensure_connection') as ec:
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(ec.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for db"""
 
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        with patch.object(connection, 'ensure_connection') as ec:
+            ec.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', max_delay=1, stdout=StringIO())
+            self.assertEqual(ec.call_count, 6)
+
+        # Backs off exponentially up to the max delay, each wait jittered
+        # down to half of it
+        delays = [call.args[0] for call in ts.call_args_list]
+        self.assertEqual(len(delays), 5)
+        for delay, limit in zip(delays, [0.1, 0.2, 0.4, 0.8, 1]):
+            self.assertGreaterEqual(delay, limit / 2)
+            self.assertLessEqual(delay, limit)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """
+        Test waiting for db fails once the timeout is over
+        """
+        with patch.object(connection, 'ensure_connection') as ec:
+            ec.side_effect = OperationalError('connection refused')
+            with self.assertRaisesMessage(CommandError,
+                                          'connection refused'):
+                call_command('wait_for_db', timeout=0, stdout=StringIO())
+
+        ts.assert_not_called()
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_migrations(self, ts):
+        """
+        Test waiting for db can wait for migrations to be applied
+        """
+        with patch('core.management.commands.wait_for_db.'
+                   'MigrationExecutor') as executor:
+            executor.return_value.migration_plan.side_effect = [
+                [('core.0001_initial', False)], []
+            ]
+            out = StringIO()
+            call_command('wait_for_db', migrations=True, stdout=out)
+
+        self.assertEqual(ts.call_count, 1)
+        self.assertIn('1 migrations pending', out.getvalue())
+
+    def test_benchmark_queries_rolls_back(self):
+        """
+        Test the query benchmark reports each scenario and leaves
+        no seeded data behind
+        """
+        out = StringIO()
+        call_command(
+            'benchmark_queries', users=1, recipes=5, tags=3, links=2,
+            repeat=1, no_plans=True, stdout=out
+        )
+
+        self.assertIn('recipe_by_tags', out.getvalue())
+        self.assertIn('before:', out.getvalue())
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_collect_images(self):
+        """
+        Test unreferenced image files and blobs are removed after the
+        grace period, referenced and recent ones are kept
+        """
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            recipe = Recipe.objects.create(
+                user=get_user_model().objects.create_user('u@example.com'),
+                title='Soup',
+                duration=5,
+                price=5
+            )
+            recipe.image.save('kept.jpg', ContentFile(b'kept'))
+            base = os.path.splitext(recipe.image.name)[0]
+            directory = os.path.join(media_root, 'uploads', 'recipe')
+            files = {
+                'kept': recipe.image.path,
+                'kept_variant': os.path.join(media_root, f'{base}_thumb.jpg'),
+                'orphan': os.path.join(directory, 'orphan.jpg'),
+                'orphan_variant': os.path.join(directory, 'orphan_full.jpg'),
+                'blob_variant': os.path.join(directory, 'blob_thumb.jpg'),
+                'copy': os.path.join(media_root, f'{base}_thumb_AbCd123.jpg'),
+                'used_copy': os.path.join(media_root,
+                                          f'{base}_full_XyZ9876.jpg'),
+                'recent': os.path.join(directory, 'recent.jpg'),
+            }
+            for name, path in files.items():
+                if not os.path.exists(path):
+                    with open(path, 'wb') as f:
+                        f.write(name.encode())
+                if name != 'recent':
+                    os.utime(path, (0, 0))
+            Recipe.objects.filter(pk=recipe.pk).update(image_variants={
+                'thumb': f'{base}_thumb.jpg',
+                'full': f'{base}_full_XyZ9876.jpg',
+            })
+            ImageBlob.objects.create(name='uploads/recipe/orphan.jpg')
+            ImageBlob.objects.create(name='uploads/recipe/blob.png',
+                                     refcount=1)
+            ImageBlob.objects.update(
+                updated_at=timezone.now() - timedelta(days=1)
+            )
+
+            out = StringIO()
+            call_command('collect_images', batch_size=2, stdout=out)
+
+            remaining = {name for name, path in files.items()
+                         if os.path.exists(path)}
+            self.assertEqual(remaining, {
+                'kept', 'kept_variant', 'blob_variant', 'used_copy', 'recent'
+            })
+            self.assertEqual(
+                set(ImageBlob.objects.values_list('name', flat=True)),
+                {recipe.image.name, 'uploads/recipe/blob.png'}
+            )
+            self.assertIn('Removed 3 orphaned files', out.getvalue())
+
+    def test_collect_images_expires_uploads(self):
+        """
+        Test uploads idle past their expiry are removed with their
+        partial file, active ones are kept
+        """
+        recipe = Recipe.objects.create(
+            user=get_user_model().objects.create_user('u@example.com'),
+            title='Soup',
+            duration=5,
+            price=5
+        )
+        with tempfile.TemporaryDirectory() as upload_dir, \
+                tempfile.TemporaryDirectory() as media_root, \
+                override_settings(RECIPE_UPLOAD_DIR=upload_dir,
+                                  MEDIA_ROOT=media_root):
+            stale, active = (ImageUpload.objects.create(
+                user=recipe.user, recipe=recipe, length=100
+            ) for _ in range(2))
+            for upload in (stale, active):
+                open(upload.path, 'wb').close()
+            ImageUpload.objects.filter(pk=stale.pk).update(
+                updated_at=timezone.now() - timedelta(days=2)
+            )
+
+            out = StringIO()
+            call_command('collect_images', stdout=out)
+
+            self.assertEqual(list(ImageUpload.objects.all()), [active])
+            self.assertEqual(os.listdir(upload_dir), [f'{active.pk}.part'])
+            self.assertIn('Removed 1 expired uploads', out.getvalue())
+
+    def test_merge_duplicate_names(self):
+        """
+        Test tags differing by case or spacing are merged into the
+        oldest one, keeping the recipes linked to any of them
+        """
+        constraint, = Tag._meta.constraints
+        with connection.schema_editor() as editor:
+            editor.remove_constraint(Tag, constraint)
+        user = get_user_model().objects.create_user('u@example.com')
+        other = get_user_model().objects.create_user('o@example.com')
+        kept, *duplicates = (Tag.objects.create(user=user, name=name)
+                             for name in ('Vegan', 'vegan', ' VEGAN'))
+        unrelated = Tag.objects.create(user=other, name='vegan')
+        recipes = []
+        for tags in ([kept, duplicates[0]], [duplicates[1]], [unrelated]):
+            recipe = Recipe.objects.create(
+                user=tags[0].user, title='Soup', duration=5, price=5
+            )
+            recipe.tags.add(*tags)
+            recipes.append(recipe)
+
+        Recipe.objects.update(
+            updated_at=timezone.now() - timedelta(days=1)
+        )
+        versions = [get_user_version(user.pk), get_user_version(other.pk)]
+
+        out = StringIO()
+        call_command('merge_duplicate_names', batch_size=1, stdout=out)
+
+        self.assertEqual(set(Tag.objects.all()), {kept, unrelated})
+        self.assertEqual(
+            [list(recipe.tags.all()) for recipe in recipes],
+            [[kept], [kept], [unrelated]]
+        )
+        self.assertIn('tags: 2 duplicates merged', out.getvalue())
+        # Relinked recipes are touched and their owner's responses
+        # invalidated
+        hour_ago = timezone.now() - timedelta(hours=1)
+        self.assertEqual(
+            [Recipe.objects.get(pk=recipe.pk).updated_at > hour_ago
+             for recipe in recipes],
+            [True, True, False]
+        )
+        self.assertNotEqual(get_user_version(user.pk), versions[0])
+        self.assertEqual(get_user_version(other.pk), versions[1])
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # The live server runs each request on a new thread, close their
+        # connections as they finish so none are left to the test database
+        cls.conn_max_age = patch.dict(connections.databases['default'],
+                                      CONN_MAX_AGE=0)
+        cls.conn_max_age.start()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.conn_max_age.stop()
+
+    def test_load_test(self):
+        """
+        Test the load test seeds a user and reports each scenario
+        """
+        out = StringIO()
+        call_command(
+            'load_test',
+            url=self.live_server_url,
+            duration=0.2,
+            concurrency=2,
+            recipes=3,
+            scenario=['recipe_list', 'recipe_create'],
+            stdout=out
+        )
+
+        rows = {line.split()[0]: line.split()[1:]
+                for line in out.getvalue().splitlines()[2:]}
+        self.assertEqual(set(rows), {'recipe_list', 'recipe_create'})
+        for requests, errors, *_ in rows.values():
+            self.assertGreater(int(requests), 0)
+            self.assertEqual(errors, '0')
+        self.assertIn('seeded 3 recipes', out.getvalue())
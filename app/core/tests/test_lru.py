@@ -0,0 +1,52 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.lru import LRUCache
+
+
+class LRUCacheTests(SimpleTestCase):
+
+    def test_evicts_least_recently_used(self):
+        """
+        Test the oldest unused entry is evicted once the cache is full
+        """
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_bounded_by_weight(self):
+        """
+        Test entries are evicted until the total weight fits, and an
+        entry heavier than the cache is not kept
+        """
+        cache = LRUCache(maxsize=10)
+        cache.set('a', 1, weight=4)
+        cache.set('b', 2, weight=4)
+        cache.set('c', 3, weight=4)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.weight, 8)
+
+        cache.set('d', 4, weight=11)
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual(len(cache), 2)
+
+    @patch('core.lru.time.monotonic')
+    def test_entries_expire(self, monotonic):
+        """
+        Test entries are dropped once their time to live has passed
+        """
+        monotonic.return_value = 100
+        cache = LRUCache(maxsize=2, ttl=10)
+        cache.set('a', 1)
+
+        monotonic.return_value = 111
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
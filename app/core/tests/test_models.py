@@ -1,6 +1,9 @@
+import hashlib
+import tempfile
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 
 from core import models
@@ -120,3 +123,59 @@ class ModelTests(TestCase):
 
         expected_path = f'uploads/recipe/{uuid}.jpg'
         self.assertEqual(file_path, expected_path)
+
+
+class ImageBlobTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.user = test_user()
+
+    def create_recipe(self, content):
+        recipe = models.Recipe.objects.create(
+            user=self.user,
+            title='Steak and mushroom',
+            duration=5,
+            price=5
+        )
+        recipe.image.save('photo.JPG', ContentFile(content))
+
+        return recipe
+
+    def test_identical_images_stored_once(self):
+        """
+        Test images are named by their content and shared by recipes
+        """
+        first = self.create_recipe(b'same bytes')
+        second = self.create_recipe(b'same bytes')
+
+        digest = hashlib.sha256(b'same bytes').hexdigest()
+        self.assertEqual(
+            first.image.name,
+            f'uploads/recipe/{digest[:2]}/{digest}.jpg'
+        )
+        self.assertEqual(second.image.name, first.image.name)
+        blob = models.ImageBlob.objects.get(name=first.image.name)
+        self.assertEqual(blob.refcount, 2)
+
+    def test_image_references_released(self):
+        """
+        Test replacing or deleting recipe images releases their blobs
+        """
+        first = self.create_recipe(b'old bytes')
+        second = self.create_recipe(b'old bytes')
+        old_name = first.image.name
+
+        first.image.save('photo.jpg', ContentFile(b'new bytes'))
+        second.delete()
+
+        self.assertEqual(
+            models.ImageBlob.objects.get(name=old_name).refcount, 0
+        )
+        self.assertEqual(
+            models.ImageBlob.objects.get(name=first.image.name).refcount, 1
+        )
@@ -0,0 +1,112 @@
+import threading
+from unittest.mock import Mock, patch
+
+from django.db import connections
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.backends.pool import ConnectionSlots
+
+
+class ConnectionSlotsTests(SimpleTestCase):
+
+    def test_waits_for_released_slot(self):
+        """
+        Test a thread over the limit waits for a slot and is counted
+        """
+        slots = ConnectionSlots(1)
+        self.assertTrue(slots.acquire())
+        timer = threading.Timer(0.05, slots.release)
+        timer.start()
+
+        self.assertTrue(slots.acquire(timeout=5))
+        timer.join()
+
+        stats = slots.stats()
+        self.assertEqual((stats['opened'], stats['closed']), (2, 1))
+        self.assertEqual((stats['waits'], stats['in_use']), (1, 1))
+        self.assertGreater(stats['wait_seconds'], 0)
+
+    def test_wait_times_out(self):
+        """
+        Test waiting for a slot gives up after the timeout
+        """
+        slots = ConnectionSlots(1)
+        slots.acquire()
+
+        self.assertFalse(slots.acquire(timeout=0.01))
+        self.assertEqual(slots.stats()['timeouts'], 1)
+
+    def test_reclaims_connections_of_exited_threads(self):
+        """
+        Test a connection left open by an exited thread is closed when
+        another thread needs its slot
+        """
+        slots = ConnectionSlots(1)
+        connection = Mock()
+
+        def open_connection():
+            slots.acquire()
+            slots.register(connection)
+
+        thread = threading.Thread(target=open_connection)
+        thread.start()
+        thread.join()
+
+        self.assertTrue(slots.acquire(timeout=0))
+        connection.close.assert_called_once_with()
+        self.assertEqual(slots.stats()['reclaimed'], 1)
+        slots.release(connection)
+        self.assertEqual(slots.stats()['in_use'], 1)
+
+
+class DatabaseWrapperTests(SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        self.connection = connections['default']
+        self.connection.ensure_connection()
+
+    def test_close_frees_slot(self):
+        """
+        Test closing a connection gives its slot back
+        """
+        in_use = self.connection.slots.stats()['in_use']
+
+        self.connection.close()
+
+        self.assertEqual(self.connection.slots.stats()['in_use'], in_use - 1)
+
+    def test_health_check_replaces_dropped_connection(self):
+        """
+        Test a kept connection that stopped working is replaced before
+        the first query of the next request
+        """
+        dropped = self.connection.connection
+        failures = self.connection.slots.stats()['health_check_failures']
+        self.connection.close_if_unusable_or_obsolete()
+        dropped.close()
+
+        with patch.dict(self.connection.settings_dict,
+                        CONN_HEALTH_CHECKS=True):
+            with self.connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+        self.assertIsNot(self.connection.connection, dropped)
+        self.assertEqual(
+            self.connection.slots.stats()['health_check_failures'],
+            failures + 1
+        )
+
+    def test_health_endpoint(self):
+        """
+        Test the health endpoint reports the database and its pools
+        """
+        res = APIClient().get(reverse('health'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['database'], 'ok')
+        self.assertIn('default', res.data['pools'])
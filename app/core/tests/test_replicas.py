@@ -0,0 +1,134 @@
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageUpload, Recipe
+from core.replicas import ReplicaRouter, _read_alias, is_pinned, read_alias
+from recipe.views import RecipeViewSet
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_follow_request_replica(self):
+        """
+        Test reads go to the request's replica and writes to the primary
+        """
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+        token = _read_alias.set('replica_0')
+        try:
+            self.assertEqual(self.router.db_for_read(Recipe), 'replica_0')
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+        finally:
+            _read_alias.reset(token)
+
+    def test_reads_in_transaction_stay_on_primary(self):
+        """
+        Test reads inside a transaction on the primary are not routed
+        """
+        token = _read_alias.set('replica_0')
+        try:
+            with patch.object(connections['default'], 'in_atomic_block',
+                              True):
+                self.assertIsNone(self.router.db_for_read(Recipe))
+        finally:
+            _read_alias.reset(token)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class ReplicaReadMixinTests(TestCase):
+
+    def setUp(self):
+        # Pins live in the cache, which the test database does not reset
+        caches[settings.DATABASE_REPLICA_CACHE_ALIAS].clear()
+        self.user = get_user_model().objects.create_user(
+            'test@webgurus.co.ke',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_read_alias(self):
+        """
+        Return the replica the recipe list was read from
+        """
+        seen = []
+        original = RecipeViewSet.list
+
+        def spy(view, request, *args, **kwargs):
+            seen.append(read_alias())
+            return original(view, request, *args, **kwargs)
+
+        with patch.object(RecipeViewSet, 'list', spy):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(read_alias())
+
+        return seen[0]
+
+    def test_safe_requests_read_replica(self):
+        """
+        Test safe requests are routed to a replica for their duration
+        """
+        self.assertEqual(self.get_read_alias(), 'replica_0')
+
+    def test_writes_pin_user_to_primary(self):
+        """
+        Test a user's reads stay on the primary for a while after they
+        write
+        """
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertTrue(is_pinned(self.user.pk))
+        self.assertIsNone(self.get_read_alias())
+
+        with override_settings(DATABASE_REPLICA_PIN_SECONDS=0):
+            self.client.post(TAGS_URL, {'name': 'Dessert'})
+        self.assertEqual(self.get_read_alias(), 'replica_0')
+
+    def test_upload_writes_pin_user_to_primary(self):
+        """
+        Test aborting an image upload pins the user to the primary
+        """
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', duration=5, price=5
+        )
+        upload = ImageUpload.objects.create(
+            user=self.user, recipe=recipe, length=10
+        )
+
+        res = self.client.delete(
+            reverse('recipe:imageupload-detail', args=[upload.pk])
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTrue(is_pinned(self.user.pk))
+
+    def test_export_reads_replica_while_streaming(self):
+        """
+        Test the export queryset keeps the replica once dispatch reset
+        the read alias
+        """
+        with patch('recipe.views.stream_export',
+                   return_value=iter(())) as stream_export:
+            res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(stream_export.call_args.args[0].db, 'replica_0')
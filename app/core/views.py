@@ -0,0 +1,35 @@
+from django.db import DatabaseError, connection
+from rest_framework import status
+from rest_framework.decorators import (
+    api_view,
+    authentication_classes,
+    permission_classes,
+)
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from core.backends.pool import pool_stats
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def health(request):
+    """
+    Report whether the database answers, with the connection counters
+    of the process serving the request
+    """
+    try:
+        connection.ensure_connection()
+        available = connection.is_usable()
+    except DatabaseError:
+        available = False
+
+    return Response(
+        {
+            'database': 'ok' if available else 'unavailable',
+            'pools': pool_stats(),
+        },
+        status=status.HTTP_200_OK if available
+        else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
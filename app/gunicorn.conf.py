@@ -0,0 +1,47 @@
+"""
+Gunicorn settings of the production profile (docker-compose.prod.yml)
+
+Every value can be overridden from the environment. Send SIGHUP to the
+master for a graceful reload: new workers load the current code and
+settings, old ones finish their requests before exiting
+"""
+import multiprocessing
+import os
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Worker processes per CPU, threads per worker for requests waiting on
+# the database; settings.DATABASES sizes the connection pool from the
+# thread count exported below
+workers = int(
+    os.environ.get('WEB_CONCURRENCY') or multiprocessing.cpu_count() * 2 + 1
+)
+# Settings refuse a per process cache when several workers run
+os.environ['WEB_CONCURRENCY'] = str(workers)
+# gthread serves app.wsgi, uvicorn.workers.UvicornWorker serves app.asgi
+# with the recipe views running as async views
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+wsgi_app = (
+    'app.asgi:application' if worker_class.startswith('uvicorn.')
+    else 'app.wsgi:application'
+)
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+os.environ['GUNICORN_THREADS'] = str(threads)
+
+# nginx keeps connections to the workers open, hold idle ones a little
+# longer than its upstream keepalive_timeout
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 75))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers now and then, jittered so they do not all restart at
+# once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+# Worker heartbeats on tmpfs, a container's /tmp may be disk backed
+worker_tmp_dir = '/dev/shm'
+accesslog = '-'
+# nginx is the only client, trust its X-Forwarded-* headers
+forwarded_allow_ips = '*'
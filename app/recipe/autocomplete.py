@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.db.models import Count
+
+from core.lru import LRUCache
+
+from recipe.cache import get_user_version
+
+
+# Prefix tries of the accounts autocompleted most recently in this
+# process, by model label and user id, weighed by their nodes and ids
+local_tries = LRUCache(
+    maxsize=settings.RECIPE_AUTOCOMPLETE_CACHE_ENTRIES,
+    ttl=settings.RECIPE_AUTOCOMPLETE_CACHE_TTL
+)
+
+
+class _Node:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+
+class PrefixTrie:
+    """
+    Trie of lower cased names keeping, at every node, the ids of the
+    size most used entries starting with that prefix
+
+    Entries are inserted most used first, so each node's list is built
+    already ranked and a lookup only walks the prefix. The weight counts
+    the entries, nodes and ids held
+    """
+
+    def __init__(self, entries, size):
+        self.size = size
+        self.entries = {}
+        self.root = _Node()
+        self.weight = 1
+        for entry in sorted(entries, key=ranking):
+            self.entries[entry['id']] = entry
+            self.weight += 1
+            node = self.root
+            self._keep(node, entry['id'])
+            for char in entry['name'].lower():
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = _Node()
+                    self.weight += 1
+                node = child
+                self._keep(node, entry['id'])
+
+    def _keep(self, node, entry_id):
+        if len(node.top) < self.size:
+            node.top.append(entry_id)
+            self.weight += 1
+
+    def lookup(self, prefix, limit):
+        """
+        Return the most used entries starting with prefix, or None when
+        more are asked for than the node could keep
+        """
+        node = self.root
+        for char in prefix.lower():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        if limit > len(node.top) == self.size:
+            return None
+
+        return [self.entries[entry_id] for entry_id in node.top[:limit]]
+
+
+def ranking(entry):
+    return (-entry['usage'], entry['name'], entry['id'])
+
+
+def with_usage(queryset, user):
+    """
+    Return the user's objects with the number of recipes using them
+    """
+    return queryset.filter(user=user).annotate(
+        usage=Count('recipe')
+    ).values('id', 'name', 'usage')
+
+
+def _get_trie(queryset, user):
+    """
+    Return the user's cached trie, rebuilt when their data changed,
+    or None when they have too many objects to keep in memory
+    """
+    key = (queryset.model._meta.label, user.pk)
+    # Read before the objects, a write meanwhile leaves a stale trie
+    # under the old version
+    version = get_user_version(user.pk)
+    cached = local_tries.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    max_items = settings.RECIPE_AUTOCOMPLETE_TRIE_MAX_ITEMS
+    entries = list(with_usage(queryset, user).order_by()[:max_items + 1])
+    trie = None
+    if len(entries) <= max_items:
+        trie = PrefixTrie(entries, settings.RECIPE_AUTOCOMPLETE_TRIE_SIZE)
+    local_tries.set(key, (version, trie),
+                    weight=1 if trie is None else trie.weight)
+
+    return trie
+
+
+def autocomplete(queryset, user, prefix, limit):
+    """
+    Return the user's objects whose name starts with prefix, case
+    insensitively, most used on their recipes first
+    """
+    trie = _get_trie(queryset, user)
+    if trie is not None:
+        results = trie.lookup(prefix, limit)
+        if results is not None:
+            return results
+
+    return list(with_usage(queryset, user).filter(
+        name__istartswith=prefix
+    ).order_by('-usage', 'name', 'id')[:limit])
@@ -0,0 +1,342 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from core.models import (
+    ImageUpload,
+    NormalizedNameMixin,
+    Recipe,
+    normalize_name,
+)
+
+from recipe.signals import RECIPE_FIELDS, bulk_changed, remove_upload_file
+
+
+MODE_ATOMIC = 'atomic'
+MODE_PARTIAL = 'partial'
+BULK_MODES = (MODE_ATOMIC, MODE_PARTIAL)
+
+RENAME_CONFLICT = 'Conflicts with an existing object'
+
+
+def _unique(values):
+    return list(dict.fromkeys(values))
+
+
+def _raw_delete(queryset):
+    # Deletes without collecting the rows or sending delete signals
+    queryset._raw_delete(queryset.db)
+
+
+def bulk_delete(queryset):
+    """
+    Delete the objects of a queryset and the rows depending on them with
+    a fixed number of queries, without their per object delete signals
+
+    Returns the deleted objects for bulk_changed() to apply what the
+    signals would have done
+    """
+    model = queryset.model
+    objs = list(queryset)
+    pks = [obj.pk for obj in objs]
+    if model in RECIPE_FIELDS:
+        field = Recipe._meta.get_field(RECIPE_FIELDS[model])
+        target = f'{field.m2m_reverse_field_name()}_id'
+        links = field.remote_field.through.objects.filter(
+            **{f'{target}__in': pks}
+        )
+        linked = {}
+        for recipe_id, pk in links.values_list('recipe_id', target):
+            linked.setdefault(pk, []).append(recipe_id)
+        for obj in objs:
+            obj._linked_recipe_ids = linked.get(obj.pk, [])
+        _raw_delete(links)
+    elif model is Recipe:
+        uploads = ImageUpload.objects.filter(recipe_id__in=pks)
+        upload_ids = list(uploads.values_list('id', flat=True))
+        _raw_delete(uploads)
+
+        def remove_upload_files():
+            for upload_id in upload_ids:
+                remove_upload_file(ImageUpload, ImageUpload(id=upload_id))
+
+        transaction.on_commit(remove_upload_files)
+        for field_name in RECIPE_FIELDS.values():
+            through = Recipe._meta.get_field(field_name).remote_field.through
+            _raw_delete(through.objects.filter(recipe_id__in=pks))
+    _raw_delete(model.objects.filter(pk__in=pks))
+
+    return objs
+
+
+class BulkModelMixin:
+    """
+    Create, update or delete many of the user's objects in one request
+
+    POST, PATCH and DELETE on the bulk endpoint take a list of items.
+    Items are validated together and referenced related objects are
+    resolved with one query per field, then the valid items are written
+    with bulk queries in a single transaction. With ?mode=atomic (the
+    default) any invalid item rejects the whole request, with
+    ?mode=partial the valid items are written and the invalid ones are
+    reported by their index
+    """
+    # Many to many fields written by the bulk actions, with their model
+    bulk_related_fields = {}
+
+    def get_bulk_serializer_class(self):
+        """
+        Return the serializer class validating each bulk item
+        """
+        return self.get_serializer_class()
+
+    def _bulk_mode(self):
+        mode = self.request.query_params.get('mode', MODE_ATOMIC)
+        if mode not in BULK_MODES:
+            raise ValidationError({
+                'mode': f'Must be one of: {", ".join(BULK_MODES)}'
+            })
+
+        return mode
+
+    def _bulk_items(self):
+        items = self.request.data
+        if not isinstance(items, list):
+            raise ValidationError({
+                'non_field_errors': ['Expected a list of items']
+            })
+        max_items = settings.RECIPE_APP_BULK_MAX_ITEMS
+        if len(items) > max_items:
+            raise ValidationError({
+                'non_field_errors': [f'At most {max_items} items per request']
+            })
+
+        return items
+
+    def _validate_bulk_items(self, items, instances=None):
+        """
+        Return the (index, instance, validated data) of valid items and
+        the errors of invalid ones
+        """
+        serializer_class = self.get_bulk_serializer_class()
+        context = self.get_serializer_context()
+        valid = []
+        errors = {}
+        for index, item in enumerate(items):
+            instance = None
+            if instances is not None:
+                item_id = item.get('id') if isinstance(item, dict) else None
+                instance = instances.get(item_id)
+                if instance is None:
+                    errors[index] = {'id': ['Not found.']}
+                    continue
+            serializer = serializer_class(
+                instance, data=item, partial=instance is not None,
+                context=context
+            )
+            if serializer.is_valid():
+                valid.append((index, instance, serializer.validated_data))
+            else:
+                errors[index] = serializer.errors
+
+        if instances is not None:
+            self._check_renames(valid, errors)
+
+        # Resolve the related IDs of every item with one query per field
+        for field, model in self.bulk_related_fields.items():
+            wanted = {pk for _, _, data in valid for pk in data.get(field, ())}
+            found = set(model.objects.filter(
+                user=self.request.user,
+                pk__in=wanted
+            ).values_list('pk', flat=True))
+            for index, _, data in valid:
+                missing = [pk for pk in data.get(field, ()) if pk not in found]
+                if missing:
+                    errors.setdefault(index, {})[field] = [
+                        f'Invalid pk "{pk}" - object does not exist.'
+                        for pk in missing
+                    ]
+        valid = [item for item in valid if item[0] not in errors]
+
+        return valid, errors
+
+    def _check_renames(self, valid, errors):
+        """
+        Report the renames onto a normalized name the user already has,
+        or that an earlier item of the request takes, as item errors
+        """
+        model = self.queryset.model
+        if not issubclass(model, NormalizedNameMixin):
+            return
+        renames = [(index, instance, normalize_name(data['name']))
+                   for index, instance, data in valid if 'name' in data]
+        taken = dict(model.objects.filter(
+            user=self.request.user,
+            normalized_name__in={name for _, _, name in renames}
+        ).values_list('normalized_name', 'pk'))
+        for index, instance, name in renames:
+            if taken.setdefault(name, instance.pk) != instance.pk:
+                errors[index] = {'name': [RENAME_CONFLICT]}
+
+    def _set_bulk_related(self, objs, datas, replace=False):
+        """
+        Write the many to many links of objects with bulk queries
+        """
+        model = self.queryset.model
+        for field in self.bulk_related_fields:
+            changed = [(obj, data[field]) for obj, data in zip(objs, datas)
+                       if field in data]
+            if not changed:
+                continue
+            model_field = model._meta.get_field(field)
+            through = model_field.remote_field.through
+            source = f'{model_field.m2m_field_name()}_id'
+            target = f'{model_field.m2m_reverse_field_name()}_id'
+            if replace:
+                through.objects.filter(**{
+                    f'{source}__in': [obj.pk for obj, _ in changed]
+                }).delete()
+            through.objects.bulk_create(
+                through(**{source: obj.pk, target: pk})
+                for obj, pks in changed for pk in _unique(pks)
+            )
+
+    def _plain_fields(self, data):
+        """
+        Return the validated data without the many to many fields
+        """
+        return {key: value for key, value in data.items()
+                if key not in self.bulk_related_fields}
+
+    def _bulk_create(self, items, mode):
+        valid, errors = self._validate_bulk_items(items)
+        if errors and mode == MODE_ATOMIC:
+            return [], errors
+        model = self.queryset.model
+        objs = [model(user=self.request.user, **self._plain_fields(data))
+                for _, _, data in valid]
+        if issubclass(model, NormalizedNameMixin):
+            objs = self._bulk_get_or_create(objs)
+        else:
+            objs = model.objects.bulk_create(objs)
+        self._set_bulk_related(objs, [data for _, _, data in valid])
+
+        return objs, errors
+
+    def _bulk_get_or_create(self, objs):
+        """
+        Return the user's objects named like each new object, creating
+        the missing ones
+        """
+        model = self.queryset.model
+        for obj in objs:
+            obj.normalize_name()
+        names = {obj.normalized_name: obj for obj in reversed(objs)}
+        model.objects.bulk_create(names.values(), ignore_conflicts=True)
+        stored = {obj.normalized_name: obj for obj in model.objects.filter(
+            user=self.request.user,
+            normalized_name__in=names
+        )}
+
+        return [stored[obj.normalized_name] for obj in objs]
+
+    def _bulk_update(self, items, mode):
+        ids = {item.get('id') for item in items if isinstance(item, dict)}
+        instances = self.filter_queryset(self.get_queryset()).in_bulk(
+            [pk for pk in ids if isinstance(pk, int)]
+        )
+        valid, errors = self._validate_bulk_items(items, instances)
+        if errors and mode == MODE_ATOMIC:
+            return [], errors
+        objs = []
+        fields = {'updated_at'}
+        now = timezone.now()
+        for _, instance, data in valid:
+            for attr, value in self._plain_fields(data).items():
+                setattr(instance, attr, value)
+                fields.add(attr)
+            if isinstance(instance, NormalizedNameMixin):
+                instance.normalize_name()
+                fields.add('normalized_name')
+            instance.updated_at = now
+            objs.append(instance)
+        self.queryset.model.objects.bulk_update(objs, sorted(fields))
+        self._set_bulk_related(
+            objs, [data for _, _, data in valid], replace=True
+        )
+
+        return objs, errors
+
+    def _bulk_delete(self, items, mode):
+        ids = [item for item in items if isinstance(item, int)]
+        found = set(self.filter_queryset(self.get_queryset()).filter(
+            pk__in=ids
+        ).values_list('pk', flat=True))
+        errors = {index: {'id': ['Not found.']}
+                  for index, item in enumerate(items)
+                  if not isinstance(item, int) or item not in found}
+        if errors and mode == MODE_ATOMIC:
+            return [], errors
+        objs = bulk_delete(self.queryset.filter(pk__in=found).order_by('pk'))
+
+        return objs, errors
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False,
+            url_path='bulk')
+    def bulk(self, request):
+        """
+        Create (POST), update (PATCH) or delete (DELETE) a list of objects
+        """
+        items = self._bulk_items()
+        mode = self._bulk_mode()
+        handler = {
+            'POST': self._bulk_create,
+            'PATCH': self._bulk_update,
+            'DELETE': self._bulk_delete,
+        }[request.method]
+        try:
+            with transaction.atomic():
+                written, errors = handler(items, mode)
+                if written:
+                    bulk_changed(
+                        self.queryset.model,
+                        request.user.pk,
+                        created=written if request.method == 'POST' else (),
+                        updated=written if request.method == 'PATCH' else (),
+                        deleted=written if request.method == 'DELETE' else ()
+                    )
+        except IntegrityError:
+            # Renames racing with another request onto the same name
+            raise ValidationError({
+                'non_field_errors': [RENAME_CONFLICT]
+            })
+
+        errors = [{'index': index, 'errors': errors[index]}
+                  for index in sorted(errors)]
+        if errors and mode == MODE_ATOMIC:
+            return Response({'errors': errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if request.method == 'DELETE':
+            data = {'deleted': [obj.pk for obj in written], 'errors': errors}
+        else:
+            objs = self.filter_queryset(self.get_queryset()).in_bulk(
+                [obj.pk for obj in written]
+            )
+            serializer = self.get_serializer(
+                [objs[obj.pk] for obj in written], many=True
+            )
+            data = {'results': serializer.data, 'errors': errors}
+
+        if errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        elif request.method == 'POST':
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_200_OK
+
+        return Response(data, status=response_status)
@@ -0,0 +1,143 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Max
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def get_cache():
+    return caches[settings.RECIPE_APP_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f'recipe-app:version:{user_id}'
+
+
+def get_user_version(user_id):
+    """
+    Return the version stamp of a user's recipe app data
+    """
+    cache = get_cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+
+    return version
+
+
+def bump_user_version(user_id):
+    """
+    Move a user to a new version stamp so none of their cached
+    responses can be read again
+    """
+    get_cache().set(_version_key(user_id), uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_user(user_id):
+    """
+    Invalidate a user's cached responses now and again on commit
+
+    The second bump drops responses cached by reads that ran between
+    the write and the end of its transaction
+    """
+    bump_user_version(user_id)
+    transaction.on_commit(lambda: bump_user_version(user_id))
+
+
+def response_etag(request):
+    """
+    Return the entity tag of a response for the requesting user
+
+    It derives from the user's version stamp and the request alone, so
+    it is known before touching the database
+    """
+    params = sorted(request.query_params.lists())
+    digest = hashlib.md5(
+        f'{get_user_version(request.user.pk)}:{request.accepted_media_type}:'
+        f'{request.get_host()}:{request.path}:{params}'.encode()
+    ).hexdigest()
+
+    return f'"{digest}"'
+
+
+def set_validators(response, etag, last_modified=None):
+    """
+    Add the conditional request validators to a per user response
+    """
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+
+    return response
+
+
+class CachedResponseMixin:
+    """
+    Serve read actions with conditional GET support and a per user
+    response cache
+
+    Both the ETag and the cache key derive from the user's version
+    stamp, which the recipe app signals bump on every write to their
+    tags, ingredients or recipes. Unchanged data is answered with a 304
+    before any query runs, and with a cached body otherwise.
+
+    Last-Modified is informational: a collection can shrink without any
+    remaining row changing, so only the ETag validates a 304.
+
+    List responses are handled here, viewsets wrap other read actions
+    with cached_response() to opt them in
+    """
+
+    def get_last_modified(self, request, *args, **kwargs):
+        """
+        Return the newest updated_at of the objects in the response
+        """
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in kwargs:
+            queryset = queryset.filter(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            )
+
+        return queryset.aggregate(
+            last_modified=Max('updated_at')
+        )['last_modified']
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        etag = response_etag(request)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return set_validators(not_modified, etag)
+
+        cache = get_cache()
+        key = f'recipe-app:response:{request.user.pk}:{etag}'
+        cached = cache.get(key)
+        if cached is not None:
+            data, last_modified = cached
+            response = Response(data)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            last_modified = self.get_last_modified(request, *args, **kwargs)
+            cache.set(key, (response.data, last_modified),
+                      timeout=settings.RECIPE_APP_CACHE_TIMEOUT)
+
+        return set_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
@@ -0,0 +1,57 @@
+import json
+
+from django.db.models import prefetch_related_objects
+from rest_framework.utils.encoders import JSONEncoder
+
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def iter_chunks(queryset, chunk_size, prefetch_related=()):
+    """
+    Yield lists of objects read through a server-side cursor
+
+    QuerySet.iterator() ignores prefetch_related, so related objects
+    are fetched once per chunk instead of once per object
+    """
+    chunk = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) == chunk_size:
+            prefetch_related_objects(chunk, *prefetch_related)
+            yield chunk
+            chunk = []
+    if chunk:
+        prefetch_related_objects(chunk, *prefetch_related)
+        yield chunk
+
+
+def _dumps(data):
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False)
+
+
+def stream_export(queryset, serializer_class, layout, chunk_size,
+                  prefetch_related=(), context=None):
+    """
+    Yield the serialized queryset as NDJSON lines or a JSON array,
+    one encoded chunk at a time
+
+    The serializer context, with its request, gives file fields the
+    absolute URLs the other endpoints return
+    """
+    first = True
+    if layout == 'json':
+        yield '['
+    for chunk in iter_chunks(queryset, chunk_size, prefetch_related):
+        items = [_dumps(serializer_class(obj, context=context).data)
+                 for obj in chunk]
+        if layout == 'json':
+            yield ('' if first else ',') + ','.join(items)
+        else:
+            yield ''.join(item + '\n' for item in items)
+        first = False
+    if layout == 'json':
+        yield ']'
@@ -0,0 +1,78 @@
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+
+
+class BatchedManyRelatedField(ManyRelatedField):
+    """
+    Many related field resolving all submitted primary keys with one
+    query, reporting every missing key together
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        pks = []
+        for item in data:
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                pks.append(int(item))
+            except (TypeError, ValueError):
+                child.fail('incorrect_type', data_type=type(item).__name__)
+        pks = list(dict.fromkeys(pks))
+
+        objs = child.get_queryset().in_bulk(pks)
+        missing = [pk for pk in pks if pk not in objs]
+        if missing:
+            raise serializers.ValidationError([
+                child.error_messages['does_not_exist'].format(pk_value=pk)
+                for pk in missing
+            ])
+
+        return [objs[pk] for pk in pks]
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key related field limited to the requesting user's objects
+    With many=True the keys are resolved in a single query
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is not None:
+            queryset = queryset.filter(user=request.user)
+
+        return queryset
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return BatchedManyRelatedField(**list_kwargs)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Read only field rendering stored image variant names as URLs
+    """
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for name, file_name in value.items():
+            url = default_storage.url(file_name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[name] = url
+
+        return urls
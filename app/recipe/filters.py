@@ -0,0 +1,138 @@
+from django.db.models import Count, Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+
+from recipe.search import SEARCH_ORDERING, search_recipes
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+
+# Integer fields filtered by ?<field>__<lookup>=
+RANGE_FIELDS = ('duration', 'price')
+RANGE_LOOKUPS = ('gt', 'gte', 'lt', 'lte')
+
+# Fields recipes can be sorted on with ?ordering=<field> or -<field>
+ORDERING_FIELDS = ('duration', 'price', 'title')
+
+
+def filter_by_related(queryset, field_name, ids, match=MATCH_ANY):
+    """
+    Filter a queryset on the objects linked through a many to many field
+
+    'any' keeps rows linked to at least one of the ids with an EXISTS
+    semi-join, 'all' keeps rows linked to every id by counting their
+    links in a grouped subquery. Neither joins the outer query, so rows
+    are never duplicated and no DISTINCT is needed
+    """
+    field = queryset.model._meta.get_field(field_name)
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    links = through.objects.filter(**{f'{target}__in': ids})
+
+    if match == MATCH_ALL:
+        matching = links.values(source).annotate(
+            matched=Count(target)
+        ).filter(matched=len(ids)).values(source)
+        return queryset.filter(pk__in=matching)
+
+    return queryset.filter(
+        Exists(links.filter(**{source: OuterRef('pk')}))
+    )
+
+
+class RecipeFilter:
+    """
+    Validate recipe list query params and apply them to a queryset
+    """
+    related_params = ('tags', 'ingredients')
+
+    def __init__(self, params):
+        self.params = params
+        self.search = params.get('q', '').strip()
+
+    def _ids(self, name):
+        """
+        Return the unique integer IDs of a comma separated param
+        """
+        value = self.params.get(name)
+        if not value:
+            return []
+        try:
+            return sorted({int(str_id) for str_id in value.split(',')})
+        except ValueError:
+            raise ValidationError({
+                name: 'Must be a comma separated list of integer IDs'
+            })
+
+    def _match(self):
+        match = self.params.get('match', MATCH_ANY)
+        if match not in MATCH_MODES:
+            raise ValidationError({
+                'match': f'Must be one of: {", ".join(MATCH_MODES)}'
+            })
+
+        return match
+
+    def _ranges(self):
+        """
+        Return the integer range lookups of the params
+        """
+        ranges = {}
+        for field in RANGE_FIELDS:
+            for lookup in RANGE_LOOKUPS:
+                name = f'{field}__{lookup}'
+                value = self.params.get(name)
+                if value is None:
+                    continue
+                try:
+                    ranges[name] = int(value)
+                except ValueError:
+                    raise ValidationError({name: 'Must be an integer'})
+
+        return ranges
+
+    def _ordering(self):
+        """
+        Return the requested sort field, '-' prefixed when descending
+        """
+        ordering = self.params.get('ordering')
+        if ordering is not None and ordering.lstrip('-') not in \
+                ORDERING_FIELDS:
+            choices = ', '.join(ORDERING_FIELDS)
+            raise ValidationError({
+                'ordering': f'Must be one of: {choices}, optionally '
+                            f'prefixed with -'
+            })
+
+        return ordering
+
+    def filter_queryset(self, queryset):
+        match = self._match()
+        for name in self.related_params:
+            ids = self._ids(name)
+            if ids:
+                queryset = filter_by_related(queryset, name, ids, match)
+        queryset = queryset.filter(**self._ranges())
+        if self.search:
+            queryset = search_recipes(queryset, self.search)
+
+        return queryset
+
+    def get_ordering(self, default):
+        """
+        Return the requested sort, otherwise search results by relevance
+        and other results by default
+
+        Ties on the sort field are broken by id in the same direction,
+        the order the (user, <field>, id) indexes are read in, which the
+        cursor position covers as well
+        """
+        ordering = self._ordering()
+        if ordering:
+            return (ordering, '-id' if ordering.startswith('-') else 'id')
+        if self.search:
+            return SEARCH_ORDERING
+
+        return default
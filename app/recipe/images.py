@@ -0,0 +1,166 @@
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, features
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core.models import Recipe
+
+from recipe.cache import invalidate_user
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    """
+    Return the process wide pool running image jobs
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.RECIPE_IMAGE_WORKERS,
+            thread_name_prefix='recipe-image'
+        )
+
+    return _executor
+
+
+def output_format():
+    """
+    Return the Pillow format and file extension of the variants
+    """
+    if settings.RECIPE_IMAGE_FORMAT == 'WEBP' and features.check('webp'):
+        return 'WEBP', 'webp'
+
+    return 'JPEG', 'jpg'
+
+
+def enqueue_recipe_image(recipe):
+    """
+    Mark a recipe image as pending and process it once committed
+
+    With RECIPE_IMAGE_WORKERS set to 0 the image is processed inline
+    """
+    Recipe.objects.filter(pk=recipe.pk).update(
+        image_status=Recipe.IMAGE_PENDING,
+        image_variants={}
+    )
+    recipe.image_status = Recipe.IMAGE_PENDING
+    recipe.image_variants = {}
+    if settings.RECIPE_IMAGE_WORKERS == 0:
+        process_recipe_image(recipe.pk)
+        recipe.refresh_from_db(fields=['image_status', 'image_variants'])
+    else:
+        transaction.on_commit(
+            lambda: get_executor().submit(_run_job, recipe.pk)
+        )
+
+
+def _run_job(recipe_id):
+    close_old_connections()
+    try:
+        process_recipe_image(recipe_id)
+    finally:
+        close_old_connections()
+
+
+def decode_image(image_file, size):
+    """
+    Decode an uploaded image upright, in RGB and without metadata
+
+    JPEGs are decoded straight at the smallest scale covering size
+    """
+    image = Image.open(image_file)
+    image.draft('RGB', (size, size))
+
+    return ImageOps.exif_transpose(image).convert('RGB')
+
+
+def encode_image(image, width, image_format, height=None):
+    """
+    Return the bytes of an image shrunk to width, keeping its aspect
+    ratio, or to fit within width x height when a height is given
+    """
+    variant = image.copy()
+    # Images are never enlarged, their own height leaves it unbounded
+    variant.thumbnail((width, height or image.height), Image.LANCZOS)
+    buffer = io.BytesIO()
+    # Nothing but the pixels is written, dropping EXIF/GPS and other
+    # metadata of the upload
+    variant.save(buffer, format=image_format,
+                 quality=settings.RECIPE_IMAGE_QUALITY, optimize=True)
+
+    return buffer.getvalue()
+
+
+def store_variant(name, data):
+    """
+    Write a variant file atomically under its own name
+
+    Jobs for recipes sharing an image may render the same variant at
+    once, the last one replaces the file instead of storage saving it
+    under a suffixed name nothing would clean up
+    """
+    path = default_storage.path(name)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        # mkstemp creates the file readable by its owner only
+        os.chmod(tmp_path, default_storage.file_permissions_mode or 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def process_recipe_image(recipe_id):
+    """
+    Decode a recipe's uploaded image and store its resized variants
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    source = recipe.image.name
+    current = Recipe.objects.filter(pk=recipe_id, image=source)
+    current.update(image_status=Recipe.IMAGE_PROCESSING)
+
+    try:
+        image_format, extension = output_format()
+        base = os.path.splitext(source)[0]
+        variants = {name: f'{base}_{name}.{extension}'
+                    for name in settings.RECIPE_IMAGE_VARIANTS}
+        # Recipes sharing an image blob share its variants as well
+        missing = {name: width
+                   for name, width in settings.RECIPE_IMAGE_VARIANTS.items()
+                   if not default_storage.exists(variants[name])}
+        if missing:
+            with recipe.image.open('rb') as image_file:
+                image = decode_image(image_file, max(missing.values()))
+            for name, width in missing.items():
+                store_variant(variants[name], encode_image(
+                    image, width, image_format, height=width
+                ))
+    except Exception:
+        logger.exception('Processing image of recipe %s failed', recipe_id)
+        current.update(image_status=Recipe.IMAGE_FAILED)
+    else:
+        # The image may have been replaced while this job ran, its
+        # variants are then left to the collect_images command
+        current.update(image_status=Recipe.IMAGE_READY,
+                       image_variants=variants,
+                       updated_at=timezone.now())
+
+    invalidate_user(recipe.user_id)
@@ -0,0 +1,136 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+def reverse_ordering(ordering):
+    return tuple(order[1:] if order.startswith('-') else f'-{order}'
+                 for order in ordering)
+
+
+class RecipeAppCursorPagination(CursorPagination):
+    """
+    Keyset pagination for user owned recipe app objects
+
+    The cursor encodes the position on every ordering field, which the
+    orderings end with the unique id, so a page starts right after the
+    previous one however many rows tie on the leading field, and deep
+    pages cost the same index range scan as the first one
+    """
+    page_size = settings.RECIPE_APP_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.RECIPE_APP_MAX_PAGE_SIZE
+    ordering = ('-id',)
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Return the viewset ordering, falling back to the default one
+
+        Viewsets ordering per request define get_ordering()
+        """
+        if hasattr(view, 'get_ordering'):
+            ordering = view.get_ordering()
+        else:
+            ordering = getattr(view, 'ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Return a page of the queryset, as CursorPagination does except
+        for filtering on the position of every ordering field
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            try:
+                queryset = queryset.filter(
+                    self.position_filter(current_position, reverse)
+                )
+            except (ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # One more row tells whether a page follows
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def position_filter(self, position, reverse):
+        """
+        Return the condition selecting the rows past a position, in the
+        direction of the cursor
+
+        A row is past the position when it equals it on the leading
+        fields and is past it on the next one
+        """
+        values = json.loads(position)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise ValueError('Cursor does not match the ordering')
+
+        condition = Q()
+        equal = {}
+        for order, value in zip(self.ordering, values):
+            field = order.lstrip('-')
+            lookup = 'lt' if reverse != order.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps([
+            str(instance[order.lstrip('-')] if isinstance(instance, dict)
+                else getattr(instance, order.lstrip('-')))
+            for order in ordering
+        ])
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from recipe.images import decode_image, encode_image, output_format
+
+
+class DiskLRUCache:
+    """
+    Files stored under their digest in a directory bounded by size,
+    evicting the least recently used first
+
+    Recency is the file mtime, refreshed on every hit, so processes
+    sharing the directory share it as well. The running size is only
+    an estimate per process and a full scan settles it before evicting.
+    Evictions go down to low_water of the bound, so the scan runs once
+    per that share of inserts rather than on every insert
+    """
+    low_water = 0.9
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    def path(self, digest, extension):
+        return os.path.join(
+            self.directory, digest[:2], digest[2:4], f'{digest}.{extension}'
+        )
+
+    def get(self, digest, extension):
+        """
+        Return the path of a cached file, or None when it is missing
+        """
+        path = self.path(digest, extension)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        return path
+
+    def set(self, digest, extension, data):
+        """
+        Store a file atomically and return its path
+        """
+        path = self.path(digest, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict(keep=path)
+
+        return path
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self, keep):
+        entries = sorted(self._entries())
+        size = sum(entry[1] for entry in entries)
+        target = self.max_bytes * self.low_water
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        self._size = size
+
+
+_cache = None
+
+
+def get_rendition_cache():
+    global _cache
+    if (_cache is None
+            or _cache.directory != settings.RECIPE_IMAGE_CACHE_DIR
+            or _cache.max_bytes != settings.RECIPE_IMAGE_CACHE_MAX_BYTES):
+        _cache = DiskLRUCache(
+            settings.RECIPE_IMAGE_CACHE_DIR,
+            settings.RECIPE_IMAGE_CACHE_MAX_BYTES
+        )
+
+    return _cache
+
+
+def rendition_digest(image_name, width):
+    """
+    Return the digest naming a rendition of an uploaded image
+
+    Image names are the digest of their content, so the name identifies
+    the content without reading it
+    """
+    image_format, _ = output_format()
+
+    # Renditions were fit in a width x width box before being resized to
+    # the width alone, 'w' keeps the new ones from matching them
+    return hashlib.sha256(
+        f'{image_name}:w{width}:{image_format}:'
+        f'{settings.RECIPE_IMAGE_QUALITY}'.encode()
+    ).hexdigest()
+
+
+def open_rendition(image, width):
+    """
+    Return an open file and the content type of an image resized to
+    width, rendering and caching it on a miss
+    """
+    image_format, extension = output_format()
+    digest = rendition_digest(image.name, width)
+    cache = get_rendition_cache()
+    path = cache.get(digest, extension)
+    if path is not None:
+        try:
+            # Once open the file survives being evicted
+            return open(path, 'rb'), f'image/{image_format.lower()}'
+        except FileNotFoundError:
+            pass
+
+    with image.open('rb') as image_file:
+        data = encode_image(
+            decode_image(image_file, width), width, image_format
+        )
+    path = cache.set(digest, extension, data)
+
+    return open(path, 'rb'), f'image/{image_format.lower()}'
+
+
+def set_rendition_headers(response, etag, last_modified):
+    """
+    Let browsers and caches keep a rendition and revalidate it by ETag
+    """
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(
+        response, private=True, max_age=settings.RECIPE_IMAGE_MAX_AGE
+    )
+    patch_vary_headers(response, ('Authorization',))
+
+    return response
@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connection
+from django.db.models import (
+    Case,
+    DecimalField,
+    Exists,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast
+
+from core.models import Recipe
+
+
+# Most relevant first, the id breaks ties in the cursor position
+SEARCH_ORDERING = ('-search_rank', '-id')
+
+# Related recipe fields searched by name, with their weight
+RELATED_WEIGHTS = (
+    ('tags', 'B'),
+    ('ingredients', 'C'),
+)
+
+
+def _links(field_name):
+    """
+    Return the through model and its recipe and related object fields
+    """
+    field = Recipe._meta.get_field(field_name)
+
+    return (
+        field.remote_field.through,
+        field.m2m_field_name(),
+        field.m2m_reverse_field_name(),
+    )
+
+
+def _related_names(field_name):
+    """
+    Return a subquery joining the names linked to each recipe
+    """
+    through, source, target = _links(field_name)
+    names = through.objects.filter(
+        **{source: OuterRef('pk')}
+    ).values(source).annotate(
+        names=StringAgg(f'{target}__name', ' ')
+    ).values('names')
+
+    return Subquery(names)
+
+
+def search_vector():
+    """
+    Return the expression of a recipe's search vector: its title
+    weighted A, tag names B and ingredient names C
+    """
+    config = settings.RECIPE_SEARCH_CONFIG
+    vector = SearchVector('title', weight='A', config=config)
+    for field_name, weight in RELATED_WEIGHTS:
+        vector = vector + SearchVector(
+            _related_names(field_name), weight=weight, config=config
+        )
+
+    return vector
+
+
+def search_vector_update():
+    """
+    Return the update() keyword refreshing the stored search vectors,
+    which only the PostgreSQL search reads
+    """
+    if connection.vendor != 'postgresql':
+        return {}
+
+    return {'search_vector': search_vector()}
+
+
+def update_search_vectors(recipes):
+    """
+    Recompute the stored search vector of a recipe queryset
+    """
+    fields = search_vector_update()
+    if fields:
+        recipes.update(**fields)
+
+
+def search_recipes(queryset, text):
+    """
+    Filter recipes matching a search and annotate their search_rank
+    """
+    if connection.vendor == 'postgresql':
+        # plainto_tsquery, websearch_to_tsquery needs PostgreSQL 11 and
+        # the compose files run 10
+        query = SearchQuery(
+            text,
+            config=settings.RECIPE_SEARCH_CONFIG,
+            search_type='plain'
+        )
+        # ts_rank is a real, read it as an exact numeric so the cursor
+        # position compares equal to the rank it was taken from
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(
+                SearchRank(F('search_vector'), query),
+                DecimalField(max_digits=20, decimal_places=10)
+            )
+        )
+
+    return _fallback_search(queryset, text)
+
+
+def _fallback_search(queryset, text):
+    """
+    Search without text search support: every word must appear in the
+    title or a tag or ingredient name, title matches rank first
+    """
+    rank = Value(0.0, output_field=FloatField())
+    for word in text.split():
+        condition = Q(title__icontains=word)
+        for field_name, _ in RELATED_WEIGHTS:
+            through, source, target = _links(field_name)
+            condition |= Q(Exists(through.objects.filter(**{
+                source: OuterRef('pk'),
+                f'{target}__name__icontains': word,
+            })))
+        queryset = queryset.filter(condition)
+        rank = rank + Case(
+            When(title__icontains=word, then=Value(1.0)),
+            default=Value(0.1),
+            output_field=FloatField()
+        )
+
+    return queryset.annotate(search_rank=rank)
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 
-from core.models import Tag, Ingredient, Recipe
+from core.models import Tag, Ingredient, Recipe, ImageUpload
+
+from recipe.fields import ImageVariantsField, UserPrimaryKeyRelatedField
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -25,15 +27,49 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_Fields = ('id',)
 
 
+class AutocompleteSerializer(serializers.Serializer):
+    """
+    Serializer class for tag and ingredient autocomplete suggestions
+    """
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(read_only=True)
+    usage = serializers.IntegerField(read_only=True)
+
+
+class GroupStatsSerializer(serializers.Serializer):
+    """
+    Serializer class for the recipe statistics of a tag or ingredient
+    """
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(read_only=True)
+    recipes = serializers.IntegerField(read_only=True)
+    average_price = serializers.FloatField(read_only=True)
+    average_duration = serializers.FloatField(read_only=True)
+
+
+class RecipeStatsSerializer(serializers.Serializer):
+    """
+    Serializer class for the recipe statistics of a user
+    """
+    recipes = serializers.IntegerField(read_only=True)
+    average_price = serializers.FloatField(read_only=True, allow_null=True)
+    average_duration = serializers.FloatField(
+        read_only=True,
+        allow_null=True
+    )
+    tags = GroupStatsSerializer(many=True, read_only=True)
+    ingredients = GroupStatsSerializer(many=True, read_only=True)
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """
     Serializer class for recipe object
     """
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -45,6 +81,21 @@ class RecipeSerializer(serializers.ModelSerializer):
         read_only_Fields = ('id',)
 
 
+class BulkRecipeSerializer(RecipeSerializer):
+    """
+    Serializer class validating the recipes of bulk requests
+    Related objects are resolved by the viewset for all items at once
+    """
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     """
     Serializer class for recipe object details view
@@ -57,13 +108,32 @@ class RecipeDetailSerializer(RecipeSerializer):
         many=True,
         read_only=True
     )
+    image_variants = ImageVariantsField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + (
+            'image', 'image_status', 'image_variants'
+        )
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """
     Serializer class for downloading images to recipe model
     """
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = ('id', 'image', 'image_status', 'image_variants')
+        read_only_fields = ('id', 'image_status')
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """
+    Serializer class for resumable recipe image uploads
+    """
+
+    class Meta:
+        model = ImageUpload
+        fields = ('id', 'recipe', 'length', 'offset', 'created_at')
+        read_only_fields = fields
@@ -0,0 +1,281 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.utils import timezone
+
+from core.models import (
+    Tag,
+    Ingredient,
+    Recipe,
+    RecipeSummary,
+    ImageBlob,
+    ImageUpload,
+)
+
+from recipe.cache import invalidate_user
+from recipe.search import search_vector_update, update_search_vectors
+
+
+# Recipe field linking each recipe attribute model to its recipes
+RECIPE_FIELDS = {
+    Tag: 'tags',
+    Ingredient: 'ingredients',
+}
+
+
+def touch_recipes(queryset):
+    """
+    Mark recipes as updated and refresh their search vectors without
+    firing their save signals
+    """
+    queryset.update(updated_at=timezone.now(), **search_vector_update())
+
+
+def invalidate_owner(sender, instance, **kwargs):
+    """
+    Invalidate the cached responses of the object's owner
+    """
+    invalidate_user(instance.user_id)
+
+
+def invalidate_links_owner(sender, instance, action, **kwargs):
+    """
+    Invalidate the cached responses of the owner of changed recipe links
+    """
+    if action.startswith('post_'):
+        invalidate_user(instance.user_id)
+
+
+def touch_linked_recipes(sender, instance, created=False, **kwargs):
+    """
+    Mark the recipes showing a renamed tag/ingredient as updated
+    """
+    if not created:
+        touch_recipes(Recipe.objects.filter(
+            **{RECIPE_FIELDS[sender]: instance}
+        ))
+
+
+def remember_linked_recipes(sender, instance, **kwargs):
+    """
+    Keep the recipes linked to a tag/ingredient about to lose its links
+    """
+    instance._linked_recipe_ids = list(Recipe.objects.filter(
+        **{RECIPE_FIELDS[type(instance)]: instance}
+    ).values_list('pk', flat=True))
+
+
+def touch_unlinked_recipes(sender, instance, **kwargs):
+    """
+    Mark the recipes a deleted or cleared tag/ingredient was linked to
+    as updated, once the links are gone
+    """
+    touch_recipes(Recipe.objects.filter(pk__in=instance._linked_recipe_ids))
+
+
+def refresh_search_vector(sender, instance, update_fields=None, **kwargs):
+    """
+    Recompute the search vector of a recipe saved with a new title
+    """
+    if update_fields is None or 'title' in update_fields:
+        update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+
+
+def touch_relinked_recipes(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """
+    Mark recipes whose tags or ingredients were linked or unlinked
+    as updated
+    """
+    if not reverse:
+        if action.startswith('post_'):
+            touch_recipes(Recipe.objects.filter(pk=instance.pk))
+    elif action in ('post_add', 'post_remove'):
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+    elif action == 'pre_clear':
+        remember_linked_recipes(type(instance), instance)
+    elif action == 'post_clear':
+        touch_unlinked_recipes(type(instance), instance)
+
+
+def remove_upload_file(sender, instance, **kwargs):
+    """
+    Remove the partial file of a finished or abandoned upload
+    """
+    try:
+        os.remove(instance.path)
+    except FileNotFoundError:
+        pass
+
+
+def remember_image(sender, instance, **kwargs):
+    """
+    Keep the image name a recipe was loaded with, unless it is deferred
+    """
+    if 'image' in instance.__dict__:
+        value = instance.__dict__['image']
+        instance._stored_image = getattr(value, 'name', value) or ''
+    else:
+        instance._stored_image = None
+
+
+def count_image_references(sender, instance, update_fields=None, **kwargs):
+    """
+    Move a reference from the previous image blob to the saved one
+    """
+    previous = instance._stored_image
+    if previous is None or (update_fields and 'image' not in update_fields):
+        return
+    name = instance.image.name or ''
+    if name != previous:
+        if name:
+            ImageBlob.objects.retain(name)
+        if previous:
+            ImageBlob.objects.release(previous)
+        instance._stored_image = name
+
+
+def release_image(sender, instance, **kwargs):
+    """
+    Drop the reference a deleted recipe held on its image blob
+    """
+    if instance._stored_image:
+        ImageBlob.objects.release(instance._stored_image)
+
+
+def create_recipe_summary(sender, instance, created, raw=False, **kwargs):
+    """
+    Start the recipe totals of a new user
+    """
+    if created and not raw:
+        RecipeSummary.objects.create(user=instance)
+
+
+def recipe_totals(recipe):
+    return int(recipe.price), int(recipe.duration)
+
+
+def remember_totals(sender, instance, **kwargs):
+    """
+    Keep the price and duration a recipe was loaded with, unless one
+    of them is deferred
+    """
+    fields = instance.__dict__
+    if instance.pk is not None and 'price' in fields and 'duration' in fields:
+        instance._stored_totals = recipe_totals(instance)
+    else:
+        instance._stored_totals = None
+
+
+def _count_changed_totals(user_id, recipes):
+    """
+    Add the price and duration changes of saved recipes to their
+    owner's totals
+    """
+    changes = [(recipe._stored_totals, recipe_totals(recipe))
+               for recipe in recipes]
+    if any(stored is None for stored, _ in changes):
+        RecipeSummary.objects.recount(user_id)
+    else:
+        RecipeSummary.objects.add(
+            user_id,
+            price=sum(new[0] - stored[0] for stored, new in changes),
+            duration=sum(new[1] - stored[1] for stored, new in changes)
+        )
+    for recipe, (_, new) in zip(recipes, changes):
+        recipe._stored_totals = new
+
+
+def count_recipe_totals(sender, instance, created, update_fields=None,
+                        **kwargs):
+    """
+    Add a saved recipe to its owner's totals
+    """
+    if created:
+        price, duration = recipe_totals(instance)
+        RecipeSummary.objects.add(instance.user_id, 1, price, duration)
+        instance._stored_totals = (price, duration)
+    elif update_fields is None or {'price', 'duration'} & set(update_fields):
+        _count_changed_totals(instance.user_id, [instance])
+
+
+def discount_recipe_totals(sender, instance, **kwargs):
+    """
+    Remove a deleted recipe from its owner's totals
+    """
+    price, duration = recipe_totals(instance)
+    RecipeSummary.objects.add(instance.user_id, -1, -price, -duration)
+
+
+def bulk_changed(model, user_id, created=(), updated=(), deleted=()):
+    """
+    Apply what the save and delete signals skipped by bulk writes would
+    have done
+
+    Deleted tags and ingredients carry the recipes they were linked to
+    in _linked_recipe_ids
+    """
+    invalidate_user(user_id)
+    if model is Recipe and (created or updated):
+        update_search_vectors(Recipe.objects.filter(
+            pk__in=[obj.pk for obj in (*created, *updated)]
+        ))
+        totals = [recipe_totals(recipe) for recipe in created]
+        RecipeSummary.objects.add(
+            user_id,
+            len(totals),
+            sum(price for price, _ in totals),
+            sum(duration for _, duration in totals)
+        )
+        if updated:
+            _count_changed_totals(user_id, updated)
+    if model in RECIPE_FIELDS and updated:
+        touch_recipes(Recipe.objects.filter(
+            **{f'{RECIPE_FIELDS[model]}__in': updated}
+        ))
+    if model is Recipe and deleted:
+        totals = [recipe_totals(recipe) for recipe in deleted]
+        RecipeSummary.objects.add(
+            user_id,
+            -len(totals),
+            -sum(price for price, _ in totals),
+            -sum(duration for _, duration in totals)
+        )
+        images = [recipe._stored_image for recipe in deleted
+                  if recipe._stored_image]
+        if images:
+            ImageBlob.objects.release_many(images)
+    if model in RECIPE_FIELDS and deleted:
+        touch_recipes(Recipe.objects.filter(pk__in={
+            recipe_id
+            for obj in deleted for recipe_id in obj._linked_recipe_ids
+        }))
+
+
+def connect_signals():
+    for model in (Tag, Ingredient, Recipe):
+        post_save.connect(invalidate_owner, sender=model)
+        post_delete.connect(invalidate_owner, sender=model)
+    for model in RECIPE_FIELDS:
+        post_save.connect(touch_linked_recipes, sender=model)
+        pre_delete.connect(remember_linked_recipes, sender=model)
+        post_delete.connect(touch_unlinked_recipes, sender=model)
+    post_save.connect(refresh_search_vector, sender=Recipe)
+    for through in (Recipe.tags.through, Recipe.ingredients.through):
+        m2m_changed.connect(invalidate_links_owner, sender=through)
+        m2m_changed.connect(touch_relinked_recipes, sender=through)
+    post_delete.connect(remove_upload_file, sender=ImageUpload)
+    post_init.connect(remember_image, sender=Recipe)
+    post_save.connect(count_image_references, sender=Recipe)
+    post_delete.connect(release_image, sender=Recipe)
+    post_save.connect(create_recipe_summary, sender=get_user_model())
+    post_init.connect(remember_totals, sender=Recipe)
+    post_save.connect(count_recipe_totals, sender=Recipe)
+    post_delete.connect(discount_recipe_totals, sender=Recipe)
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db.models import Avg, Count
+
+from core.models import Recipe, RecipeSummary
+
+
+# Recipe fields the statistics are broken down by
+GROUP_FIELDS = ('tags', 'ingredients')
+
+
+def _average(total, count):
+    return total / count if count else None
+
+
+def group_stats(field_name, user):
+    """
+    Return the user's most used objects of a recipe field with the
+    number, average price and average duration of their recipes
+    """
+    model = Recipe._meta.get_field(field_name).related_model
+
+    return model.objects.filter(user=user).annotate(
+        recipes=Count('recipe'),
+        average_price=Avg('recipe__price'),
+        average_duration=Avg('recipe__duration')
+    ).filter(recipes__gt=0).order_by('-recipes', 'name', 'id').values(
+        'id', 'name', 'recipes', 'average_price', 'average_duration'
+    )[:settings.RECIPE_STATS_MAX_GROUPS]
+
+
+def recipe_stats(user):
+    """
+    Return the user's recipe statistics, overall from their summary
+    and grouped by tag and ingredient
+    """
+    totals = RecipeSummary.objects.totals(user.pk)
+    count = totals['recipe_count']
+    stats = {
+        'recipes': count,
+        'average_price': _average(totals['price_total'], count),
+        'average_duration': _average(totals['duration_total'], count),
+    }
+    for field_name in GROUP_FIELDS:
+        stats[field_name] = list(group_stats(field_name, user))
+
+    return stats
@@ -0,0 +1,320 @@
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageBlob, Tag, Ingredient, Recipe, RecipeSummary
+
+
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+
+
+class BulkRecipeApiTests(TestCase):
+    """
+    Test the bulk recipe endpoints
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@webgurus.co.ke',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Kale'
+        )
+
+    def recipe_payload(self, index):
+        return {
+            'title': f'Recipe {index}',
+            'duration': 10,
+            'price': 5,
+            'tags': [self.tag.id],
+            'ingredients': [self.ingredient.id],
+        }
+
+    def test_bulk_create_recipes(self):
+        """
+        Test creating many recipes with their links in one request
+        """
+        payload = [self.recipe_payload(i) for i in range(3)]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['results']), 3)
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 3)
+        for recipe in recipes:
+            self.assertEqual(list(recipe.tags.all()), [self.tag])
+            self.assertEqual(list(recipe.ingredients.all()), [self.ingredient])
+
+    def test_bulk_create_query_count_is_constant(self):
+        """
+        Test the number of queries does not grow with the item count
+        """
+        for size in (1, 10):
+            payload = [self.recipe_payload(i) for i in range(size)]
+            # savepoint, 2 lookups, 3 inserts, search vector update,
+            # summary update, release, 3 reads
+            with self.assertNumQueries(12):
+                self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+    def test_bulk_create_atomic_rejects_all(self):
+        """
+        Test an invalid item rejects the whole request by default
+        """
+        other_tag = Tag.objects.create(
+            user=get_user_model().objects.create_user(
+                'other@webgurus.co.ke', 'testpass'
+            ),
+            name='Other'
+        )
+        payload = [self.recipe_payload(0), self.recipe_payload(1)]
+        payload[1]['tags'] = [other_tag.id]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'][0]['index'], 1)
+        self.assertIn('tags', res.data['errors'][0]['errors'])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_partial_keeps_valid_items(self):
+        """
+        Test partial mode writes the valid items and reports the others
+        """
+        payload = [self.recipe_payload(0), {'title': 'No price'}]
+
+        res = self.client.post(
+            f'{RECIPES_BULK_URL}?mode=partial', payload, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['errors'][0]['index'], 1)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_bulk_update_recipes(self):
+        """
+        Test updating fields and links of many recipes
+        """
+        recipe1 = Recipe.objects.create(
+            user=self.user, title='Old 1', duration=5, price=3
+        )
+        recipe2 = Recipe.objects.create(
+            user=self.user, title='Old 2', duration=5, price=3
+        )
+        recipe2.tags.add(self.tag)
+        payload = [
+            {'id': recipe1.id, 'title': 'New 1', 'tags': [self.tag.id]},
+            {'id': recipe2.id, 'tags': []},
+        ]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        self.assertEqual(recipe1.title, 'New 1')
+        self.assertEqual(list(recipe1.tags.all()), [self.tag])
+        self.assertFalse(recipe2.tags.exists())
+
+    def test_bulk_delete_recipes(self):
+        """
+        Test deleting many recipes, never touching other users' ones
+        """
+        recipe = Recipe.objects.create(
+            user=self.user, title='Mine', duration=5, price=3
+        )
+        other = Recipe.objects.create(
+            user=get_user_model().objects.create_user(
+                'other@webgurus.co.ke', 'testpass'
+            ),
+            title='Theirs', duration=5, price=3
+        )
+
+        res = self.client.delete(
+            f'{RECIPES_BULK_URL}?mode=partial', [recipe.id, other.id],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data['deleted'], [recipe.id])
+        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=other.id).exists())
+
+    def sample_recipes(self, count, **params):
+        """
+        Create recipes linked to the test tag and ingredient
+        """
+        recipes = Recipe.objects.bulk_create(
+            Recipe(user=self.user, title=f'Recipe {i}', duration=10,
+                   price=5, **params)
+            for i in range(count)
+        )
+        for field, obj in (('tags', self.tag),
+                           ('ingredients', self.ingredient)):
+            through = Recipe._meta.get_field(field).remote_field.through
+            through.objects.bulk_create(
+                through(recipe_id=recipe.id, **{f'{obj._meta.model_name}_id':
+                                                obj.id})
+                for recipe in recipes
+            )
+        RecipeSummary.objects.recount(self.user.id)
+
+        return [recipe.id for recipe in recipes]
+
+    def test_bulk_delete_applies_signal_effects(self):
+        """
+        Test bulk deleting recipes updates their owner's totals and
+        releases their images without the per row delete signals
+        """
+        kept = Recipe.objects.create(
+            user=self.user, title='Kept', duration=7, price=2
+        )
+        ImageBlob.objects.create(name='uploads/recipe/a.jpg', refcount=3)
+        ids = self.sample_recipes(2, image='uploads/recipe/a.jpg')
+
+        res = self.client.delete(RECIPES_BULK_URL, ids, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['deleted'], ids)
+        self.assertEqual(list(Recipe.objects.filter(user=self.user)), [kept])
+        summary = RecipeSummary.objects.get(user=self.user)
+        self.assertEqual(
+            (summary.recipe_count, summary.price_total,
+             summary.duration_total),
+            (1, 2, 7)
+        )
+        self.assertEqual(
+            ImageBlob.objects.get(name='uploads/recipe/a.jpg').refcount, 1
+        )
+        self.assertFalse(Recipe.tags.through.objects.filter(
+            recipe_id__in=ids
+        ).exists())
+
+    def test_bulk_delete_query_count_is_constant(self):
+        """
+        Test the number of delete queries does not grow with the item
+        count
+        """
+        for size in (2, 50):
+            ids = self.sample_recipes(size, image='uploads/recipe/a.jpg')
+            # savepoint, lookup, select, uploads select and delete, 2 link
+            # deletes, delete, summary update, image release, release
+            with self.assertNumQueries(11):
+                res = self.client.delete(RECIPES_BULK_URL, ids,
+                                         format='json')
+            self.assertEqual(len(res.data['deleted']), size)
+
+    def test_bulk_delete_tags_touches_recipes(self):
+        """
+        Test bulk deleting tags marks their recipes as updated, with a
+        fixed number of queries
+        """
+        for size in (2, 50):
+            recipe_id = self.sample_recipes(1)[0]
+            tags = Tag.objects.bulk_create(
+                Tag(user=self.user, name=f'Tag {size} {i}',
+                    normalized_name=f'tag {size} {i}')
+                for i in range(size)
+            )
+            Recipe.objects.get(id=recipe_id).tags.add(*tags)
+            long_ago = datetime(2000, 1, 1, tzinfo=timezone.utc)
+            Recipe.objects.filter(id=recipe_id).update(updated_at=long_ago)
+
+            # savepoint, lookup, select, links select and delete, delete,
+            # recipes update, release
+            with self.assertNumQueries(8):
+                res = self.client.delete(
+                    TAGS_BULK_URL, [tag.id for tag in tags], format='json'
+                )
+
+            self.assertEqual(len(res.data['deleted']), size)
+            self.assertGreater(Recipe.objects.get(id=recipe_id).updated_at,
+                               long_ago)
+            self.assertEqual(
+                list(Recipe.objects.get(id=recipe_id).tags.all()), [self.tag]
+            )
+
+    def test_bulk_create_tags(self):
+        """
+        Test creating many tags in one request
+        """
+        payload = [{'name': 'Lunch'}, {'name': 'Dinner'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            set(Tag.objects.filter(user=self.user).values_list(
+                'name', flat=True
+            )),
+            {'Vegan', 'Lunch', 'Dinner'}
+        )
+
+    def test_bulk_create_tags_existing_names(self):
+        """
+        Test tags differing only by case or spacing are created once
+        """
+        payload = [{'name': 'vegan '}, {'name': 'Lunch'}, {'name': 'LUNCH'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        ids = [tag['id'] for tag in res.data['results']]
+        self.assertEqual(ids[0], self.tag.id)
+        self.assertEqual(ids[1], ids[2])
+        self.assertEqual(
+            set(Tag.objects.filter(user=self.user).values_list(
+                'name', flat=True
+            )),
+            {'Vegan', 'Lunch'}
+        )
+
+    def test_bulk_rename_tags_conflicts_reported(self):
+        """
+        Test renames onto a taken name, or one an earlier item takes,
+        are item errors and partial mode writes the other items
+        """
+        pepper, salt, sugar = (Tag.objects.create(user=self.user, name=name)
+                               for name in ('Pepper', 'Salt', 'Sugar'))
+        payload = [
+            {'id': salt.id, 'name': 'pepper'},
+            {'id': sugar.id, 'name': 'Honey'},
+            {'id': pepper.id, 'name': ' PEPPER'},
+            {'id': self.tag.id, 'name': 'honey'},
+        ]
+
+        res = self.client.patch(
+            f'{TAGS_BULK_URL}?mode=partial', payload, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([error['index'] for error in res.data['errors']],
+                         [0, 3])
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Honey', 'PEPPER']
+        )
+
+        res = self.client.patch(TAGS_BULK_URL, payload[:2], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'][0]['index'], 0)
+
+    def test_bulk_requires_list(self):
+        """
+        Test the bulk endpoints reject a single object
+        """
+        res = self.client.post(TAGS_BULK_URL, {'name': 'Lunch'},
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,196 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipe.cache import get_cache
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_recipe_url(recipe_id):
+    """
+    Return recipe details url
+    """
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ResponseCacheTests(TestCase):
+    """
+    Test the per user response cache of the recipe app endpoints
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'test@webgurus.co.ke',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """
+        Test repeating a list request does not hit the database
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+        first = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(TAGS_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data, second.data)
+
+    def test_cache_keyed_by_query_params(self):
+        """
+        Test different query params are cached separately
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Lunch')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Salad', duration=5, price=3
+        )
+        recipe.tags.add(tag)
+
+        self.client.get(TAGS_URL)
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_not_shared_between_users(self):
+        """
+        Test a user never receives another user's cached response
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        user2 = get_user_model().objects.create_user(
+            'other@webgurus.co.ke',
+            'testpass'
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_api_write_invalidates_cache(self):
+        """
+        Test creating a tag through the API invalidates the list
+        """
+        self.client.get(TAGS_URL)
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_related_changes_invalidate_recipe_detail(self):
+        """
+        Test renaming or linking tags and ingredients invalidates
+        the cached recipe detail
+        """
+        recipe = Recipe.objects.create(
+            user=self.user, title='Salad', duration=5, price=3
+        )
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        url = detail_recipe_url(recipe.id)
+        self.client.get(url)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(url)
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegetarian')
+
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Kale')
+        )
+        res = self.client.get(url)
+        self.assertEqual(len(res.data['ingredients']), 1)
+
+        recipe.delete()
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ConditionalGetTests(TestCase):
+    """
+    Test ETag and Last-Modified support of the recipe app endpoints
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'test@webgurus.co.ke',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_sends_validators(self):
+        """
+        Test list responses carry an ETag and a Last-Modified date
+        """
+        Recipe.objects.create(
+            user=self.user, title='Salad', duration=5, price=3
+        )
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertTrue(res.has_header('ETag'))
+        self.assertTrue(res.has_header('Last-Modified'))
+        self.assertIn('private', res['Cache-Control'])
+
+    def test_unchanged_list_not_modified(self):
+        """
+        Test a matching If-None-Match is answered with a 304
+        without querying the database
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_write_changes_etag(self):
+        """
+        Test deleting an object changes the collection ETag
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        etag = self.client.get(TAGS_URL)['ETag']
+        tag.delete()
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_related_changes_touch_recipe(self):
+        """
+        Test linking and renaming tags updates the recipe's updated_at
+        """
+        recipe = Recipe.objects.create(
+            user=self.user, title='Salad', duration=5, price=3
+        )
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        created = recipe.updated_at
+
+        recipe.tags.add(tag)
+        recipe.refresh_from_db()
+        linked = recipe.updated_at
+        self.assertGreater(linked, created)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, linked)
@@ -1,22 +1,33 @@
+import base64
 import tempfile
+import json
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
 # from rest_framework import serializers
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, RecipeSummary, Tag, Ingredient, recipe_totals
 
+from recipe.images import process_recipe_image, store_variant
+from recipe.renditions import DiskLRUCache
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 
 RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+STATS_URL = reverse('recipe:recipe-stats')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
 
 
 def image_upload_url(recipe_id):
@@ -26,6 +37,15 @@ def image_upload_url(recipe_id):
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
 
+def image_rendition_url(recipe_id, width):
+    """
+    Return the url of a resized rendition of a recipe's photo
+    """
+    url = reverse('recipe:recipe-image-rendition', args=[recipe_id])
+
+    return f'{url}?w={width}'
+
+
 def detail_recipe_url(recipe_id):
     """
     Return recipe details url
@@ -104,7 +124,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """
@@ -122,8 +142,8 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_details_recipe_view(self):
         """
@@ -200,6 +220,52 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_resolves_tags_in_one_query(self):
+        """
+        Test the submitted tags are looked up with a single query
+        """
+        tags = [test_tag(user=self.user, name=f'Tag {i}') for i in range(10)]
+        request = APIRequestFactory().post(RECIPES_URL)
+        request.user = self.user
+        serializer = RecipeSerializer(
+            data={
+                'title': 'Many tags',
+                'duration': 10,
+                'price': 5,
+                'tags': [tag.id for tag in tags],
+                'ingredients': [],
+            },
+            context={'request': request}
+        )
+
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+
+        self.assertEqual(serializer.validated_data['tags'], tags)
+
+    def test_create_recipe_rejects_foreign_and_missing_tags(self):
+        """
+        Test other users' and unknown tags are reported together
+        """
+        tag = test_tag(user=self.user)
+        other_tag = test_tag(user=get_user_model().objects.create_user(
+            'other@webgurus.co.ke',
+            'pass24638'
+        ))
+        payload = {
+            'title': 'Stolen tags',
+            'tags': [tag.id, other_tag.id, 999999],
+            'duration': 30,
+            'price': 10.00
+        }
+
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertIn(str(other_tag.id), res.data['tags'][0])
+        self.assertFalse(Recipe.objects.exists())
+
     def test_partial_update_recipe(self):
         """
         Test updating a recipe with http patch method
@@ -243,6 +309,188 @@ class PrivateRecipeApiTests(TestCase):
         tags = recipe.tags.all()
         self.assertEqual(len(tags), 0)
 
+    def test_list_recipes_query_count_is_constant(self):
+        """
+        Test listing recipes uses a fixed number of queries
+        regardless of how many recipes are returned
+        """
+        tag = test_tag(user=self.user)
+        ingredient = test_ingredient(user=self.user)
+        for count in (1, 10):
+            for _ in range(count):
+                recipe = test_recipe(user=self.user)
+                recipe.tags.add(tag)
+                recipe.ingredients.add(ingredient)
+
+            # recipes, tags, ingredients and the Last-Modified aggregate
+            with self.assertNumQueries(4):
+                res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_details_recipe_query_count(self):
+        """
+        Test viewing a recipe detail prefetches its tags and ingredients
+        """
+        recipe = test_recipe(user=self.user)
+        for i in range(5):
+            recipe.tags.add(test_tag(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                test_ingredient(user=self.user, name=f'Ingredient {i}')
+            )
+
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_recipe_url(recipe.id))
+
+        self.assertEqual(len(res.data['tags']), 5)
+        self.assertEqual(len(res.data['ingredients']), 5)
+
+    def test_list_recipes_paginated_by_cursor(self):
+        """
+        Test walking the recipe list pages with the cursor links
+        """
+        recipes = [test_recipe(user=self.user) for _ in range(5)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        seen = []
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 2)
+            seen.extend(item['id'] for item in res.data['results'])
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        expected = sorted((recipe.id for recipe in recipes), reverse=True)
+        self.assertEqual(seen, expected)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_recipes_ndjson(self):
+        """
+        Test streaming the user's recipes as NDJSON lines
+        """
+        tag = test_tag(user=self.user)
+        for _ in range(5):
+            test_recipe(user=self.user).tags.add(tag)
+        test_recipe(user=get_user_model().objects.create_user(
+            'other@webgurus.co.ke',
+            'pass24638'
+        ))
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        content = b''.join(res.streaming_content).decode()
+        lines = [json.loads(line) for line in content.splitlines()]
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        serializer = RecipeDetailSerializer(recipes, many=True)
+        self.assertEqual(lines, json.loads(json.dumps(serializer.data)))
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_recipes_json_array(self):
+        """
+        Test streaming the user's recipes as a single JSON array
+        """
+        for _ in range(3):
+            test_recipe(user=self.user)
+
+        res = self.client.get(EXPORT_URL, {'layout': 'json'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        data = json.loads(b''.join(res.streaming_content))
+        self.assertEqual(len(data), 3)
+
+    def test_export_recipes_absolute_image_urls(self):
+        """
+        Test exported image URLs are absolute, as the detail endpoint
+        returns them
+        """
+        recipe = test_recipe(user=self.user)
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image='uploads/recipe/photo.jpg',
+            image_variants={'thumb': 'uploads/recipe/photo_thumb.jpg'}
+        )
+
+        res = self.client.get(EXPORT_URL)
+
+        exported = json.loads(b''.join(res.streaming_content))
+        detail = self.client.get(detail_recipe_url(recipe.id)).data
+        self.assertTrue(exported['image'].startswith('http://testserver/'))
+        self.assertEqual(exported['image'], detail['image'])
+        self.assertEqual(exported['image_variants'],
+                         detail['image_variants'])
+
+    def test_export_recipes_invalid_layout(self):
+        """
+        Test exporting with an unknown layout is rejected
+        """
+        res = self.client.get(EXPORT_URL, {'layout': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recipe_stats(self):
+        """
+        Test the recipe count and averages, overall and by tag and
+        ingredient
+        """
+        vegan = test_tag(user=self.user, name='Vegan')
+        dessert = test_tag(user=self.user, name='Dessert')
+        test_tag(user=self.user, name='Unused')
+        kale = test_ingredient(user=self.user, name='Kale')
+        test_recipe(user=self.user, duration=10, price=4).tags.add(vegan)
+        recipe = test_recipe(user=self.user, duration=30, price=8)
+        recipe.tags.add(vegan, dessert)
+        recipe.ingredients.add(kale)
+        test_recipe(user=get_user_model().objects.create_user(
+            'other@webgurus.co.ke',
+            'pass24638'
+        ), price=100)
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipes'], 2)
+        self.assertEqual(res.data['average_price'], 6)
+        self.assertEqual(res.data['average_duration'], 20)
+        self.assertEqual(
+            [(tag['name'], tag['recipes'], tag['average_price'])
+             for tag in res.data['tags']],
+            [('Vegan', 2, 6), ('Dessert', 1, 8)]
+        )
+        self.assertEqual(
+            [(item['id'], item['average_duration'])
+             for item in res.data['ingredients']],
+            [(kale.id, 30)]
+        )
+
+    def test_recipe_stats_summary_follows_writes(self):
+        """
+        Test the stored recipe totals follow single and bulk writes
+        """
+        recipe = test_recipe(user=self.user, duration=10, price=4)
+        test_recipe(user=self.user, duration=20, price=6)
+        self.client.patch(detail_recipe_url(recipe.id), {'price': 9})
+        self.client.post(RECIPES_BULK_URL, [
+            {'title': 'Bulk', 'duration': 5, 'price': 1},
+        ], format='json')
+        self.client.patch(RECIPES_BULK_URL, [
+            {'id': recipe.id, 'duration': 15},
+        ], format='json')
+        Recipe.objects.filter(title='Bulk').delete()
+
+        summary = RecipeSummary.objects.get(user=self.user)
+        self.assertEqual(
+            (summary.recipe_count, summary.price_total,
+             summary.duration_total),
+            (2, 15, 35)
+        )
+        self.assertEqual(
+            RecipeSummary.objects.totals(self.user.pk),
+            recipe_totals(self.user.pk)
+        )
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['average_price'], 7.5)
+
 
 class RecipeImageUploadTests(TestCase):
     """
@@ -259,8 +507,22 @@ class RecipeImageUploadTests(TestCase):
         """
         Clean up function (for removing temp files)
         """
+        self.recipe.refresh_from_db()
+        for name in self.recipe.image_variants.values():
+            default_storage.delete(name)
         self.recipe.image.delete()
 
+    def upload_image(self, size=(10, 10), **save_kwargs):
+        """
+        Upload a generated JPEG image to the test recipe
+        """
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new('RGB', size)
+            img.save(ntf, format='JPEG', **save_kwargs)
+            ntf.seek(0)
+            return self.client.post(url, {'image': ntf}, format='multipart')
+
     def test_upload_image_to_recipe(self):
         """
         Test successful uploading of an image to recipe model
@@ -274,10 +536,64 @@ class RecipeImageUploadTests(TestCase):
             res = self.client.post(url, {'image': ntf}, format='multipart')
 
         self.recipe.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn('image', res.data)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    @override_settings(RECIPE_IMAGE_WORKERS=0)
+    def test_upload_image_generates_variants(self):
+        """
+        Test processing an upload stores metadata free resized variants
+        """
+        exif = Image.Exif()
+        exif[0x010f] = 'Test camera'
+        res = self.upload_image(size=(1000, 500), exif=exif.tobytes())
+
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_READY)
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            set(self.recipe.image_variants),
+            set(settings.RECIPE_IMAGE_VARIANTS)
+        )
+        with default_storage.open(self.recipe.image_variants['thumb']) as f:
+            thumb = Image.open(f)
+            self.assertEqual(thumb.size, (160, 80))
+            self.assertFalse(thumb.getexif())
+        with default_storage.open(self.recipe.image_variants['full']) as f:
+            self.assertEqual(Image.open(f).size, (1000, 500))
+
+    def test_store_variant_replaces_in_place(self):
+        """
+        Test storing a variant again overwrites it under the same name
+        """
+        name = 'uploads/recipe/store_variant_test_thumb.jpg'
+        self.addCleanup(default_storage.delete, name)
+
+        store_variant(name, b'first')
+        store_variant(name, b'second')
+
+        _, files = default_storage.listdir('uploads/recipe')
+        self.assertEqual(
+            [f for f in files if f.startswith('store_variant_test')],
+            ['store_variant_test_thumb.jpg']
+        )
+        with default_storage.open(name) as f:
+            self.assertEqual(f.read(), b'second')
+
+    def test_process_corrupt_image_fails(self):
+        """
+        Test an image that cannot be decoded is marked as failed
+        """
+        self.recipe.image.save('broken.jpg', ContentFile(b'not an image'))
+
+        with self.assertLogs('recipe.images', 'ERROR'):
+            process_recipe_image(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+        self.assertEqual(self.recipe.image_variants, {})
+
     def test_upload_image_bad_request(self):
         """
         Test uploading an invalid or empty image
@@ -306,9 +622,9 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """
@@ -331,6 +647,265 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipes_by_tags_unique(self):
+        """
+        Test a recipe matching several filter tags is returned once
+        """
+        recipe = test_recipe(user=self.user)
+        tag1 = test_tag(user=self.user, name='Test tag 1')
+        tag2 = test_tag(user=self.user, name='Test tag 2')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': '{},{}'.format(tag1.id, tag2.id)}
+        )
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_recipes_match_all(self):
+        """
+        Test match=all only returns recipes having every filter tag
+        """
+        recipe1 = test_recipe(user=self.user, title='Recipe test 7')
+        recipe2 = test_recipe(user=self.user, title='Recipe test 8')
+        tag1 = test_tag(user=self.user, name='Test tag 1')
+        tag2 = test_tag(user=self.user, name='Test tag 2')
+        ingredient = test_ingredient(user=self.user)
+        recipe1.tags.add(tag1, tag2)
+        recipe1.ingredients.add(ingredient)
+        recipe2.tags.add(tag1)
+        recipe2.ingredients.add(ingredient)
+
+        res = self.client.get(RECIPES_URL, {
+            'tags': '{},{},{}'.format(tag1.id, tag2.id, tag1.id),
+            'ingredients': str(ingredient.id),
+            'match': 'all',
+        })
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipes_by_ranges(self):
+        """
+        Test filtering recipes by duration and price ranges
+        """
+        quick_cheap = test_recipe(user=self.user, duration=20, price=8)
+        test_recipe(user=self.user, duration=20, price=15)
+        test_recipe(user=self.user, duration=45, price=8)
+        test_recipe(user=self.user, duration=30, price=3)
+
+        res = self.client.get(RECIPES_URL, {
+            'duration__lt': 30,
+            'price__gte': 5,
+            'price__lte': 10,
+        })
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [quick_cheap.id, self.recipe.id])
+
+    def test_sort_recipes_paginated_by_cursor(self):
+        """
+        Test walking sorted recipe pages returns every recipe once, in
+        order with ties broken by id
+        """
+        recipes = [self.recipe] + [test_recipe(user=self.user, price=price)
+                                   for price in (7, 3, 7, 1, 7)]
+
+        for ordering, descending in (('price', False), ('-price', True)):
+            url = RECIPES_URL + f'?ordering={ordering}&page_size=2'
+            seen = []
+            while url:
+                res = self.client.get(url)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                seen += [item['id'] for item in res.data['results']]
+                url = res.data['next']
+
+            expected = sorted(recipes, key=lambda recipe: (
+                recipe.price, recipe.id
+            ), reverse=descending)
+            self.assertEqual(seen, [recipe.id for recipe in expected])
+
+    def test_sort_recipes_paginated_past_many_ties(self):
+        """
+        Test walking pages of recipes sharing the sort value returns
+        each once, past the offset DRF cursors could skip ties with
+        """
+        Recipe.objects.bulk_create(
+            Recipe(user=self.user, title='Tie', duration=5, price=5)
+            for _ in range(1300)
+        )
+        expected = list(Recipe.objects.filter(user=self.user).order_by(
+            'price', 'id'
+        ).values_list('id', flat=True))
+
+        url = RECIPES_URL + '?ordering=price&page_size=200'
+        seen = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen += [item['id'] for item in res.data['results']]
+            url = res.data['next']
+            self.assertLessEqual(len(seen), len(expected))
+
+        self.assertEqual(seen, expected)
+        last_page = (len(expected) - 1) // 200 * 200
+        res = self.client.get(res.data['previous'])
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         expected[last_page - 200:last_page])
+
+    def test_sort_recipes_invalid_cursor(self):
+        """
+        Test cursors not matching the ordering fields are rejected
+        """
+        for position in (b'["5"]', b'["cheap", "1"]', b'5'):
+            cursor = base64.b64encode(b'p=' + position).decode()
+            res = self.client.get(RECIPES_URL, {
+                'ordering': 'price',
+                'cursor': cursor,
+            })
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_filter_recipes_invalid_params(self):
+        """
+        Test malformed filter params are rejected
+        """
+        for params in ({'tags': '1,a'}, {'tags': '1', 'match': 'some'},
+                       {'price__lte': 'cheap'}, {'ordering': 'user'}):
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeImageRenditionTests(TestCase):
+    """
+    Test resized renditions of recipe images
+    """
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        cache_settings = override_settings(
+            RECIPE_IMAGE_CACHE_DIR=cache_dir.name
+        )
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+        self.cache_dir = cache_dir.name
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user', 'testpass')
+        self.client.force_authenticate(self.user)
+        self.recipe = test_recipe(user=self.user)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (1000, 500)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            self.recipe.image.save('photo.jpg', ntf)
+        self.addCleanup(self.recipe.image.delete)
+
+    def cached_files(self):
+        return [name for _, _, files in os.walk(self.cache_dir)
+                for name in files]
+
+    def test_rendition_resized_and_cached(self):
+        """
+        Test a rendition fits the width and is rendered only once
+        """
+        res = self.client.get(image_rendition_url(self.recipe.id, 320))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('image/'))
+        self.assertIn('ETag', res)
+        self.assertIn('max-age', res['Cache-Control'])
+        image = Image.open(ContentFile(b''.join(res.streaming_content)))
+        self.assertEqual(image.size, (320, 160))
+        self.assertEqual(len(self.cached_files()), 1)
+
+        res = self.client.get(image_rendition_url(self.recipe.id, 320))
+        b''.join(res.streaming_content)
+        self.assertEqual(len(self.cached_files()), 1)
+
+    def test_rendition_portrait_resized_to_width(self):
+        """
+        Test a portrait rendition is as wide as asked, not fit in a
+        square of that width
+        """
+        self.addCleanup(self.recipe.image.storage.delete,
+                        self.recipe.image.name)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (500, 1000)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            self.recipe.image.save('portrait.jpg', ntf)
+
+        res = self.client.get(image_rendition_url(self.recipe.id, 320))
+
+        image = Image.open(ContentFile(b''.join(res.streaming_content)))
+        self.assertEqual(image.size, (320, 640))
+
+    def test_rendition_not_modified(self):
+        """
+        Test a matching If-None-Match is answered with 304
+        """
+        url = image_rendition_url(self.recipe.id, 160)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_rendition_width_not_allowed(self):
+        """
+        Test widths outside the configured list are rejected
+        """
+        res = self.client.get(image_rendition_url(self.recipe.id, 321))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.cached_files(), [])
+
+    def test_rendition_without_image(self):
+        """
+        Test a recipe without an image has no renditions
+        """
+        recipe = test_recipe(user=self.user, title='No photo')
+
+        res = self.client.get(image_rendition_url(recipe.id, 160))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_disk_cache_evicts_least_recently_used(self):
+        """
+        Test the rendition cache stays within its size bound
+        """
+        cache = DiskLRUCache(self.cache_dir, max_bytes=25)
+        cache.set('aa01', 'bin', b'x' * 10)
+        cache.set('aa02', 'bin', b'x' * 10)
+        os.utime(cache.path('aa01', 'bin'), (0, 0))
+        os.utime(cache.path('aa02', 'bin'), (1, 1))
+        cache.get('aa01', 'bin')
+        cache.set('aa03', 'bin', b'x' * 10)
+
+        self.assertIsNotNone(cache.get('aa01', 'bin'))
+        self.assertIsNone(cache.get('aa02', 'bin'))
+        self.assertIsNotNone(cache.get('aa03', 'bin'))
+
+    def test_disk_cache_evicts_below_bound(self):
+        """
+        Test the rendition cache evicts down to its low water mark, so
+        the next inserts do not scan the directory again
+        """
+        cache = DiskLRUCache(self.cache_dir, max_bytes=100)
+        for i in range(11):
+            cache.set(f'aa{i:02}', 'bin', b'x' * 10)
+            os.utime(cache.path(f'aa{i:02}', 'bin'), (i, i))
+
+        self.assertIsNone(cache.get('aa00', 'bin'))
+        self.assertIsNone(cache.get('aa01', 'bin'))
+        self.assertIsNotNone(cache.get('aa02', 'bin'))
+        with patch.object(cache, '_entries') as entries:
+            cache.set('aa11', 'bin', b'x' * 10)
+        entries.assert_not_called()
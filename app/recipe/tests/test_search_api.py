@@ -0,0 +1,148 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.search import update_search_vectors
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, title, tags=(), ingredients=()):
+    recipe = Recipe.objects.create(
+        user=user,
+        title=title,
+        duration=10,
+        price=5
+    )
+    recipe.tags.add(*(Tag.objects.create(user=user, name=name)
+                      for name in tags))
+    recipe.ingredients.add(*(Ingredient.objects.create(user=user, name=name)
+                             for name in ingredients))
+
+    return recipe
+
+
+class RecipeSearchApiTests(TestCase):
+    """
+    Test searching recipes with ?q=
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, text, **params):
+        res = self.client.get(RECIPES_URL, {'q': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_search_ranks_title_first(self):
+        """
+        Test title, tag and ingredient matches are found, best first
+        """
+        sample_recipe(self.user, 'Lemon cake', ingredients=['Chicken egg'])
+        sample_recipe(self.user, 'Chicken curry', tags=['Dinner'])
+        sample_recipe(self.user, 'Salad', tags=['Chicken dishes'])
+        sample_recipe(self.user, 'Pancakes')
+        other = get_user_model().objects.create_user('other@example.com')
+        sample_recipe(other, 'Chicken soup')
+
+        titles = self.search('chicken')
+
+        self.assertEqual(titles[0], 'Chicken curry')
+        self.assertEqual(set(titles),
+                         {'Chicken curry', 'Salad', 'Lemon cake'})
+
+    def test_search_ignores_query_syntax(self):
+        """
+        Test search text is matched word by word, operators included
+        """
+        sample_recipe(self.user, 'Chicken curry')
+        sample_recipe(self.user, 'Chicken soup')
+
+        self.assertEqual(self.search('"chicken" & -curry | !'),
+                         ['Chicken curry'])
+
+    def test_search_follows_renamed_tags(self):
+        """
+        Test renaming or unlinking a tag updates the recipes it is on
+        """
+        recipe = sample_recipe(self.user, 'Curry', tags=['Spicy'])
+        tag = recipe.tags.get()
+
+        tag.name = 'Vegan'
+        tag.save()
+        self.assertEqual(self.search('spicy'), [])
+        self.assertEqual(self.search('vegan'), ['Curry'])
+
+        tag.recipe_set.clear()
+        self.assertEqual(self.search('vegan'), [])
+
+    def test_search_pages_follow_rank(self):
+        """
+        Test walking search result pages returns every match once
+        """
+        tag = Tag.objects.create(user=self.user, name='Soup')
+        for i in range(5):
+            recipe = sample_recipe(self.user, f'Soup {i}')
+            if i % 2:
+                recipe.tags.add(tag)
+
+        titles = []
+        url = RECIPES_URL + '?q=soup&page_size=2'
+        while url:
+            res = self.client.get(url)
+            titles += [recipe['title'] for recipe in res.data['results']]
+            url = res.data['next']
+
+        self.assertEqual(sorted(titles), [f'Soup {i}' for i in range(5)])
+        self.assertEqual(titles, self.search('soup', page_size=5))
+
+    def test_search_pages_past_many_ties(self):
+        """
+        Test walking search result pages returns each match once when
+        more recipes share a rank than DRF cursors could skip
+        """
+        Recipe.objects.bulk_create(
+            Recipe(user=self.user, title='Soup', duration=5, price=5)
+            for _ in range(1300)
+        )
+        update_search_vectors(Recipe.objects.all())
+
+        ids = []
+        url = RECIPES_URL + '?q=soup&page_size=200'
+        while url:
+            res = self.client.get(url)
+            ids += [recipe['id'] for recipe in res.data['results']]
+            url = res.data['next']
+            self.assertLessEqual(len(ids), 1300)
+
+        self.assertEqual(
+            ids,
+            list(Recipe.objects.order_by('-id').values_list('id', flat=True))
+        )
+
+    @patch('recipe.search.connection')
+    def test_search_fallback(self, connection):
+        """
+        Test databases without text search match every word by substring
+        """
+        connection.vendor = 'sqlite'
+        sample_recipe(self.user, 'Green curry', ingredients=['Coconut milk'])
+        sample_recipe(self.user, 'Coconut cake')
+        sample_recipe(self.user, 'Red curry')
+
+        self.assertEqual(self.search('curry coconut'), ['Green curry'])
+        self.assertEqual(self.search('coconut')[0], 'Coconut cake')
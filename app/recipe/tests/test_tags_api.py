@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -10,6 +12,7 @@ from core.models import Tag, Recipe
 from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
+TAGS_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
 
 
 class PublicTagsApiTests(TestCase):
@@ -55,7 +58,7 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by('-name')  # return tags in order
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """
@@ -71,8 +74,8 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successful(self):
         """
@@ -96,6 +99,20 @@ class PrivateTagsApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_tag_existing_name(self):
+        """
+        Test adding a tag differing only by case or spacing returns the
+        existing one
+        """
+        tag = Tag.objects.create(user=self.user, name='Comfort Food')
+
+        res = self.client.post(TAGS_URL, {'name': ' comfort  food'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['id'], tag.id)
+        self.assertEqual(res.data['name'], 'Comfort Food')
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_retrieve_tags_assigned_to_recipes(self):
         """
         Test filtering tags by those assigned to recipes
@@ -114,8 +131,8 @@ class PrivateTagsApiTests(TestCase):
 
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_tags_assigned_unique(self):
         """
@@ -140,4 +157,125 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_retrieve_tags_page_size(self):
+        """
+        Test the tags list honours the requested page size
+        """
+        for name in ('Vegan', 'Dessert', 'Lunch'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [tag['name'] for tag in res.data['results']]
+        self.assertEqual(names, ['Vegan', 'Lunch'])
+        self.assertIsNotNone(res.data['next'])
+
+    def test_retrieve_tags_without_distinct(self):
+        """
+        Test the tag listings never de-duplicate with DISTINCT
+        """
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe = Recipe.objects.create(
+            title='Pancakes',
+            duration=5,
+            price=3.00,
+            user=self.user
+        )
+        recipe.tags.add(tag)
+
+        for params in ({}, {'assigned_only': 1}):
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(TAGS_URL, params)
+            self.assertEqual(len(res.data['results']), 1)
+            for query in ctx.captured_queries:
+                self.assertNotIn('DISTINCT', query['sql'])
+
+    def create_used_tags(self, usage):
+        """
+        Create tags linked to as many recipes as their usage
+        """
+        for name, count in usage.items():
+            tag = Tag.objects.create(user=self.user, name=name)
+            for _ in range(count):
+                Recipe.objects.create(
+                    title='Sample',
+                    duration=5,
+                    price=3.00,
+                    user=self.user
+                ).tags.add(tag)
+
+    def autocomplete(self, **params):
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [(tag['name'], tag['usage']) for tag in res.data]
+
+    def test_autocomplete_ranked_by_usage(self):
+        """
+        Test prefix matches come most used first, case insensitively
+        """
+        self.create_used_tags({'Dinner': 1, 'dessert': 3, 'Diet': 0,
+                               'Vegan': 5})
+        other = get_user_model().objects.create_user('other@example.com')
+        Tag.objects.create(user=other, name='Dim sum')
+
+        self.assertEqual(
+            self.autocomplete(prefix='d'),
+            [('dessert', 3), ('Dinner', 1), ('Diet', 0)]
+        )
+        self.assertEqual(self.autocomplete(prefix='DI', limit=1),
+                         [('Dinner', 1)])
+        self.assertEqual(self.autocomplete(prefix='x'), [])
+
+    def test_autocomplete_follows_changes(self):
+        """
+        Test cached suggestions are rebuilt once the user's tags change
+        """
+        self.create_used_tags({'Dinner': 1})
+        self.assertEqual(self.autocomplete(prefix='d'), [('Dinner', 1)])
+
+        Tag.objects.filter(user=self.user).get().delete()
+        self.create_used_tags({'Brunch': 2})
+
+        self.assertEqual(self.autocomplete(prefix='d'), [])
+        self.assertEqual(self.autocomplete(prefix='b'), [('Brunch', 2)])
+
+    @override_settings(RECIPE_AUTOCOMPLETE_TRIE_MAX_ITEMS=1)
+    def test_autocomplete_large_account(self):
+        """
+        Test accounts too large for a trie are answered from the database
+        """
+        self.create_used_tags({'Dinner': 1, 'Dessert': 2, 'Vegan': 0})
+
+        self.assertEqual(
+            self.autocomplete(prefix='d'),
+            [('Dessert', 2), ('Dinner', 1)]
+        )
+
+    @override_settings(RECIPE_AUTOCOMPLETE_TRIE_SIZE=1)
+    def test_autocomplete_beyond_trie_size(self):
+        """
+        Test limits above the ids kept per trie node are answered from
+        the database
+        """
+        self.create_used_tags({'Dinner': 1, 'Dessert': 2, 'Vegan': 0})
+
+        self.assertEqual(self.autocomplete(prefix='d', limit=1),
+                         [('Dessert', 2)])
+        self.assertEqual(
+            self.autocomplete(prefix='d', limit=2),
+            [('Dessert', 2), ('Dinner', 1)]
+        )
+        self.assertEqual(self.autocomplete(prefix='v', limit=2),
+                         [('Vegan', 0)])
+
+    def test_autocomplete_invalid_limit(self):
+        """
+        Test the limit must be a positive integer within the maximum
+        """
+        for limit in ('0', 'ten', '1000'):
+            res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'limit': limit})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
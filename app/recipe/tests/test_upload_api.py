@@ -0,0 +1,209 @@
+import io
+import os
+import tempfile
+from datetime import timedelta
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageUpload, Recipe
+
+from recipe.uploads import CHUNK_CONTENT_TYPE
+
+
+def create_upload_url(recipe_id):
+    return reverse('recipe:recipe-create-image-upload', args=[recipe_id])
+
+
+def upload_url(upload_id):
+    return reverse('recipe:imageupload-detail', args=[upload_id])
+
+
+def sample_jpeg(size=(200, 100)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size).save(buffer, format='JPEG')
+
+    return buffer.getvalue()
+
+
+class ResumableImageUploadTests(TestCase):
+    """
+    Test resumable recipe image uploads
+    """
+
+    def setUp(self):
+        upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(upload_dir.cleanup)
+        upload_settings = override_settings(
+            RECIPE_UPLOAD_DIR=upload_dir.name,
+            RECIPE_UPLOAD_MAX_BYTES=1024 * 1024
+        )
+        upload_settings.enable()
+        self.upload_dir = upload_dir.name
+        self.addCleanup(upload_settings.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pancakes',
+            duration=10,
+            price=5
+        )
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+    def start_upload(self, length):
+        return self.client.post(
+            create_upload_url(self.recipe.id),
+            HTTP_UPLOAD_LENGTH=str(length)
+        )
+
+    def send_chunk(self, upload_id, offset, data):
+        return self.client.patch(
+            upload_url(upload_id),
+            data,
+            content_type=CHUNK_CONTENT_TYPE,
+            HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def test_upload_in_chunks(self):
+        """
+        Test an upload resumed from its offset becomes the recipe image
+        """
+        image = sample_jpeg()
+        res = self.start_upload(len(image))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res['Upload-Offset'], '0')
+        self.assertTrue(res['Location'].endswith(upload_url(res.data['id'])))
+        upload_id = res.data['id']
+
+        res = self.send_chunk(upload_id, 0, image[:100])
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        res = self.client.head(upload_url(upload_id))
+        self.assertEqual(res['Upload-Offset'], '100')
+        self.assertEqual(res['Upload-Length'], str(len(image)))
+
+        res = self.send_chunk(upload_id, 100, image[100:])
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
+
+        self.recipe.refresh_from_db()
+        with self.recipe.image.open('rb') as f:
+            self.assertEqual(f.read(), image)
+        self.assertFalse(ImageUpload.objects.filter(pk=upload_id).exists())
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    @override_settings(RECIPE_UPLOAD_MAX_OPEN=2)
+    def test_open_uploads_capped(self):
+        """
+        Test a user cannot start more uploads than allowed at once,
+        uploads idle past their expiry aside
+        """
+        first = self.start_upload(1000).data['id']
+        self.start_upload(1000)
+
+        res = self.start_upload(1000)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        ImageUpload.objects.filter(pk=first).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+        res = self.start_upload(1000)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_chunk_offset_mismatch(self):
+        """
+        Test a chunk not sent at the stored offset is rejected
+        """
+        upload_id = self.start_upload(1000).data['id']
+
+        res = self.send_chunk(upload_id, 10, b'x' * 10)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(ImageUpload.objects.get(pk=upload_id).offset, 0)
+
+    def test_chunk_past_length(self):
+        """
+        Test a chunk cannot grow an upload past its length
+        """
+        image = sample_jpeg()
+        upload_id = self.start_upload(len(image)).data['id']
+
+        res = self.send_chunk(upload_id, 0, image + b'x')
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+    def test_upload_not_an_image(self):
+        """
+        Test an upload is dropped once its first bytes are not an image
+        """
+        upload_id = self.start_upload(1000).data['id']
+
+        res = self.send_chunk(upload_id, 0, b'%PDF-1.4 not an image')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageUpload.objects.filter(pk=upload_id).exists())
+
+    def test_upload_too_large(self):
+        """
+        Test uploads larger than the configured maximum are refused
+        """
+        res = self.start_upload(1024 * 1024 + 1)
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_chunk_content_type(self):
+        """
+        Test chunks must be sent as application/offset+octet-stream
+        """
+        upload_id = self.start_upload(1000).data['id']
+
+        res = self.client.patch(
+            upload_url(upload_id),
+            b'x',
+            content_type='application/octet-stream',
+            HTTP_UPLOAD_OFFSET='0'
+        )
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        )
+
+    def test_upload_of_other_user(self):
+        """
+        Test uploads are only reachable by their owner
+        """
+        upload_id = self.start_upload(1000).data['id']
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.send_chunk(upload_id, 0, b'x')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
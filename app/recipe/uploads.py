@@ -0,0 +1,214 @@
+import fcntl
+import os
+from datetime import timedelta
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files import File
+from django.http import UnreadablePostError
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from core.models import ImageUpload
+
+from recipe.images import enqueue_recipe_image
+
+
+TUS_VERSION = '1.0.0'
+CHUNK_CONTENT_TYPE = 'application/offset+octet-stream'
+
+# Leading bytes of the accepted image formats, by file extension
+IMAGE_SIGNATURES = {
+    'jpg': ((0, b'\xff\xd8\xff'),),
+    'png': ((0, b'\x89PNG\r\n\x1a\n'),),
+    'gif': ((0, b'GIF8'),),
+    'webp': ((0, b'RIFF'), (8, b'WEBP')),
+}
+SIGNATURE_BYTES = 12
+
+
+class UploadConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Upload-Offset does not match the upload offset.'
+    default_code = 'conflict'
+
+
+class TooManyUploads(APIException):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_detail = 'Too many uploads in progress.'
+    default_code = 'too_many_uploads'
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Upload exceeds the allowed size.'
+    default_code = 'too_large'
+
+
+def _header_int(request, header):
+    """
+    Return a non negative integer request header
+    """
+    value = request.META.get(f'HTTP_{header.upper().replace("-", "_")}')
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = -1
+    if value < 0:
+        raise ValidationError({header: 'Must be a non negative integer'})
+
+    return value
+
+
+def sniff_extension(head):
+    """
+    Return the file extension of an image from its leading bytes
+    """
+    for extension, signature in IMAGE_SIGNATURES.items():
+        if all(head[start:start + len(magic)] == magic
+               for start, magic in signature):
+            return extension
+
+    return None
+
+
+def upload_headers(response, upload):
+    """
+    Add the resumable upload protocol headers to a response
+    """
+    response['Tus-Resumable'] = TUS_VERSION
+    response['Upload-Offset'] = upload.offset
+    response['Upload-Length'] = upload.length
+    response['Cache-Control'] = 'no-store'
+
+    return response
+
+
+def open_uploads(user):
+    """
+    Return the uploads of a user not idle long enough to be expired
+    """
+    return ImageUpload.objects.filter(
+        user=user,
+        updated_at__gte=timezone.now() - timedelta(
+            seconds=settings.RECIPE_UPLOAD_EXPIRE_SECONDS
+        )
+    )
+
+
+def create_upload(request, recipe):
+    """
+    Start an upload of the length announced by the Upload-Length header
+    """
+    length = _header_int(request, 'Upload-Length')
+    if length > settings.RECIPE_UPLOAD_MAX_BYTES:
+        raise UploadTooLarge()
+    if length < SIGNATURE_BYTES:
+        raise ValidationError({'Upload-Length': 'Too small for an image'})
+    if open_uploads(request.user).count() >= settings.RECIPE_UPLOAD_MAX_OPEN:
+        raise TooManyUploads()
+
+    upload = ImageUpload.objects.create(
+        user=request.user,
+        recipe=recipe,
+        length=length
+    )
+    os.makedirs(settings.RECIPE_UPLOAD_DIR, exist_ok=True)
+    open(upload.path, 'xb').close()
+
+    return upload
+
+
+def _write_body(request, part, remaining):
+    """
+    Copy the request body to the part file a buffer at a time, returning
+    the number of bytes written before the body ended
+    """
+    written = 0
+    while written < remaining:
+        buffer = request.read(
+            min(settings.RECIPE_UPLOAD_BUFFER_SIZE, remaining - written)
+        )
+        if not buffer:
+            break
+        part.write(buffer)
+        written += len(buffer)
+
+    return written
+
+
+def receive_chunk(request, upload):
+    """
+    Append the request body to an upload at the Upload-Offset header
+
+    Chunks of one upload are written one at a time under a lock on the
+    part file. Bytes received before a client disconnects are kept, so
+    the next chunk resumes from the stored offset. Returns True when
+    the last byte was received and the image handed to the recipe
+    """
+    offset = _header_int(request, 'Upload-Offset')
+    content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+
+    with open(upload.path, 'r+b') as part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadConflict('Another chunk of this upload is in flight.')
+
+        upload.refresh_from_db(fields=['offset'])
+        if offset != upload.offset:
+            raise UploadConflict()
+        if offset + content_length > upload.length:
+            raise UploadTooLarge('Chunk exceeds the Upload-Length.')
+
+        part.seek(offset)
+        written = 0
+        try:
+            written = _write_body(request, part, content_length)
+        except UnreadablePostError:
+            pass
+        finally:
+            part.flush()
+            upload.offset = offset + written
+            ImageUpload.objects.filter(pk=upload.pk).update(
+                offset=upload.offset,
+                updated_at=timezone.now()
+            )
+
+        if offset < SIGNATURE_BYTES <= upload.offset:
+            part.seek(0)
+            if sniff_extension(part.read(SIGNATURE_BYTES)) is None:
+                upload.delete()
+                raise ValidationError({'image': 'Unsupported image format'})
+
+        if upload.offset < upload.length:
+            return False
+
+        finalize_upload(upload, part)
+
+    return True
+
+
+def finalize_upload(upload, part):
+    """
+    Verify an assembled image and make it the recipe's image
+    """
+    part.seek(0)
+    extension = sniff_extension(part.read(SIGNATURE_BYTES))
+    try:
+        part.seek(0)
+        Image.open(part).verify()
+    except Exception:
+        upload.delete()
+        raise ValidationError({
+            'image': 'Upload a valid image. The file you uploaded was '
+                     'either not an image or a corrupted image.'
+        })
+
+    recipe = upload.recipe
+    part.seek(0)
+    recipe.image.save(f'{upload.pk}.{extension}', File(part))
+    upload.delete()
+    enqueue_recipe_image(recipe)
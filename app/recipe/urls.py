@@ -8,9 +8,22 @@ router = DefaultRouter()
 router.register('tags', views.TagViewSet)
 router.register('ingredients', views.IngredientViewSet)
 router.register('recipes', views.RecipeViewSet)
+router.register('image-uploads', views.ImageUploadViewSet)
+
+# Served by app.asgi: the recipe and image upload views run as async
+# views, the tag and ingredient ones as they are
+async_router = DefaultRouter()
+async_router.register('tags', views.TagViewSet)
+async_router.register('ingredients', views.IngredientViewSet)
+async_router.register('recipes', views.AsyncRecipeViewSet)
+async_router.register('image-uploads', views.AsyncImageUploadViewSet)
 
 app_name = 'recipe'
 
 urlpatterns = [
     path('', include(router.urls))
 ]
+
+async_urlpatterns = [
+    path('', include(async_router.urls))
+]
@@ -1,15 +1,49 @@
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
 from rest_framework.decorators import action
+from rest_framework.exceptions import (
+    NotFound,
+    UnsupportedMediaType,
+    ValidationError,
+)
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Tag, Ingredient, Recipe
+from account.authentication import CachedTokenAuthentication
+from core.async_views import AsyncViewMixin
+from core.models import Tag, Ingredient, Recipe, ImageUpload, normalize_name
+from core.replicas import ReplicaReadMixin, read_alias
 
 from recipe import serializers
+from recipe.autocomplete import autocomplete
+from recipe.bulk import BulkModelMixin
+from recipe.cache import CachedResponseMixin
+from recipe.exports import EXPORT_CONTENT_TYPES, stream_export
+from recipe.filters import RecipeFilter
+from recipe.images import enqueue_recipe_image
+from recipe.pagination import RecipeAppCursorPagination
+from recipe.renditions import (
+    open_rendition,
+    rendition_digest,
+    set_rendition_headers,
+)
+from recipe.stats import recipe_stats
+from recipe.uploads import (
+    CHUNK_CONTENT_TYPE,
+    create_upload,
+    receive_chunk,
+    upload_headers,
+)
 
 
 class MainRecipeAppViewSet(
+    ReplicaReadMixin,
+    CachedResponseMixin,
+    BulkModelMixin,
     viewsets.GenericViewSet,
     mixins.ListModelMixin,
     mixins.CreateModelMixin
@@ -17,8 +51,11 @@ class MainRecipeAppViewSet(
     """
     Base viewset for user owned recipe attributes
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAppCursorPagination
+    # Names are not unique, the id keeps the cursor order stable
+    ordering = ('-name', '-id')
 
     def get_queryset(self):
         """
@@ -27,20 +64,67 @@ class MainRecipeAppViewSet(
         assigned_only = bool(
             int(self.request.query_params.get('assigned_only', 0))
         )
-        queryset = self.queryset
+        queryset = self.queryset.filter(
+            user=self.request.user
+        )
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(self._assigned_to_recipe())
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+        return queryset.order_by(*self.ordering)
+
+    def _assigned_to_recipe(self):
+        """
+        Return an EXISTS condition matching objects used by any recipe
+
+        A semi-join stops at the first link, unlike a join through the
+        recipes which fans out and then needs DISTINCT to collapse
+        """
+        relation = self.queryset.model._meta.get_field('recipe')
+        links = relation.through.objects.filter(**{
+            relation.field.m2m_reverse_field_name(): OuterRef('pk')
+        })
+
+        return Exists(links)
 
     def perform_create(self, serializer):
         """
-        Create a new object
+        Create a new object, or return the user's object whose name
+        only differs by case or spacing
         """
-        serializer.save(
-            user=self.request.user
+        name = serializer.validated_data['name']
+        serializer.instance, _ = self.queryset.model.objects.get_or_create(
+            user=self.request.user,
+            normalized_name=normalize_name(name),
+            defaults={'name': name}
+        )
+
+    @action(methods=['GET'], detail=False, url_path='autocomplete')
+    def autocomplete(self, request):
+        """
+        Return the objects whose name starts with ?prefix=, most used
+        first, at most ?limit= of them
+        """
+        max_limit = settings.RECIPE_AUTOCOMPLETE_MAX_LIMIT
+        try:
+            limit = int(request.query_params.get(
+                'limit', settings.RECIPE_AUTOCOMPLETE_LIMIT
+            ))
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= max_limit:
+            raise ValidationError({
+                'limit': f'Must be an integer from 1 to {max_limit}'
+            })
+
+        results = autocomplete(
+            self.queryset,
+            request.user,
+            request.query_params.get('prefix', '').strip(),
+            limit
+        )
+
+        return Response(
+            serializers.AutocompleteSerializer(results, many=True).data
         )
 
 
@@ -60,38 +144,75 @@ class IngredientViewSet(MainRecipeAppViewSet):
     serializer_class = serializers.IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    ReplicaReadMixin,
+    CachedResponseMixin,
+    BulkModelMixin,
+    viewsets.ModelViewSet
+):
     """
     Manage recipes in the database
     """
-    queryset = Recipe.objects.all()
+    # The search vector is only read by the database
+    queryset = Recipe.objects.defer('search_vector')
     serializer_class = serializers.RecipeSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-
-    def _params_to_ints(self, qs):
-        """
-        Function to convert a list of string IDs to list of integers
-        """
-        return [int(str_id) for str_id in qs.split(',')]
+    pagination_class = RecipeAppCursorPagination
+    ordering = ('-id',)
+    # Related lookups each action's serializer needs, fetched up front
+    # so serializing N recipes costs a fixed number of queries
+    action_prefetch_related = {
+        'list': ('tags', 'ingredients'),
+        'retrieve': ('tags', 'ingredients'),
+        'bulk': ('tags', 'ingredients'),
+    }
+    action_select_related = {}
+    bulk_related_fields = {
+        'tags': Tag,
+        'ingredients': Ingredient,
+    }
 
     def get_queryset(self):
         """
         Retrieve recipes that are specific to logged in user
-        Filter recipes accordingly
-        """
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-
-        return queryset.filter(
+        Filter and search recipes accordingly
+        """
+        queryset = RecipeFilter(
+            self.request.query_params
+        ).filter_queryset(self.queryset)
+
+        queryset = queryset.filter(
             user=self.request.user
+        ).order_by(*self.get_ordering())
+
+        return self._optimize_queryset(queryset)
+
+    def get_ordering(self):
+        """
+        Return the ordering of the requested recipes, as requested
+        (?ordering=) or by relevance when searching (?q=)
+        """
+        return RecipeFilter(
+            self.request.query_params
+        ).get_ordering(self.ordering)
+
+    def _optimize_queryset(self, queryset):
+        """
+        Apply the select/prefetch related lookups for the current action
+        """
+        select_related = self.action_select_related.get(self.action)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        prefetch_related = self.action_prefetch_related.get(self.action)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+
+        return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
         )
 
     def get_serializer_class(self):
@@ -105,6 +226,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def get_bulk_serializer_class(self):
+        return serializers.BulkRecipeSerializer
+
     def perform_create(self, serializer):
         """
         Create a new recipe and assign the logged in user
@@ -124,12 +248,182 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            # Resizing runs in the background, clients poll image_status
+            enqueue_recipe_image(recipe)
             return Response(
                 serializer.data,
-                status=status.HTTP_200_OK
+                status=status.HTTP_202_ACCEPTED
             )
 
         return Response(
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(methods=['POST'], detail=True, url_path='image-uploads')
+    def create_image_upload(self, request, pk=None):
+        """
+        Start a resumable upload of the recipe image
+
+        The Upload-Length header gives the image size, chunks are then
+        sent to the returned Location
+        """
+        upload = create_upload(request, self.get_object())
+        response = Response(
+            serializers.ImageUploadSerializer(upload).data,
+            status=status.HTTP_201_CREATED
+        )
+        response['Location'] = request.build_absolute_uri(
+            reverse('recipe:imageupload-detail', args=[upload.pk])
+        )
+
+        return upload_headers(response, upload)
+
+    @action(methods=['GET'], detail=True, url_path='image')
+    def image_rendition(self, request, pk=None):
+        """
+        Return the recipe image resized to fit the requested width (?w=)
+        """
+        widths = [str(width) for width in settings.RECIPE_IMAGE_WIDTHS]
+        width = request.query_params.get('w')
+        if width not in widths:
+            raise ValidationError({
+                'w': f'Must be one of: {", ".join(widths)}'
+            })
+
+        recipe = self.get_object()
+        if not recipe.image:
+            raise NotFound('This recipe has no image.')
+
+        etag = f'"{rendition_digest(recipe.image.name, int(width))}"'
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(recipe.updated_at.timestamp())
+        )
+        if not_modified is not None:
+            return set_rendition_headers(
+                not_modified, etag, recipe.updated_at
+            )
+
+        rendition, content_type = open_rendition(recipe.image, int(width))
+
+        return set_rendition_headers(
+            FileResponse(rendition, content_type=content_type),
+            etag,
+            recipe.updated_at
+        )
+
+    @action(methods=['GET'], detail=False, url_path='stats')
+    def stats(self, request):
+        """
+        Return the number of recipes and their average price and
+        duration, overall and for the most used tags and ingredients
+        """
+        return self.cached_response(self._stats, request)
+
+    def _stats(self, request):
+        return Response(
+            serializers.RecipeStatsSerializer(recipe_stats(request.user)).data
+        )
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """
+        Stream all of the user's recipes with their tags and ingredients
+        as NDJSON (default) or a JSON array (?layout=json)
+        """
+        layout = request.query_params.get('layout', 'ndjson')
+        if layout not in EXPORT_CONTENT_TYPES:
+            raise ValidationError({
+                'layout': f'Must be one of: {", ".join(EXPORT_CONTENT_TYPES)}'
+            })
+
+        queryset = self.get_queryset()
+        if read_alias() is not None:
+            # The response is iterated after dispatch reset the alias
+            queryset = queryset.using(read_alias())
+        response = StreamingHttpResponse(
+            stream_export(
+                queryset,
+                serializers.RecipeDetailSerializer,
+                layout,
+                settings.RECIPE_EXPORT_CHUNK_SIZE,
+                prefetch_related=('tags', 'ingredients'),
+                context=self.get_serializer_context(),
+            ),
+            content_type=EXPORT_CONTENT_TYPES[layout]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{layout}"'
+        )
+
+        return response
+
+
+class ImageUploadViewSet(
+    ReplicaReadMixin,
+    viewsets.GenericViewSet,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin
+):
+    """
+    Resume, inspect (GET/HEAD) or abort (DELETE) recipe image uploads
+
+    PATCH appends the application/offset+octet-stream body at the
+    Upload-Offset header. Once the last byte arrives the image is
+    verified and handed to the recipe like a regular upload
+    """
+    queryset = ImageUpload.objects.all()
+    serializer_class = serializers.ImageUploadSerializer
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        """
+        Return uploads of the current logged in user
+        """
+        return self.queryset.filter(user=self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        upload = self.get_object()
+
+        return upload_headers(
+            Response(self.get_serializer(upload).data), upload
+        )
+
+    def partial_update(self, request, *args, **kwargs):
+        """
+        Append a chunk to the upload
+        """
+        if request.content_type.split(';')[0] != CHUNK_CONTENT_TYPE:
+            raise UnsupportedMediaType(request.content_type)
+
+        upload = self.get_object()
+        if not receive_chunk(request, upload):
+            return upload_headers(
+                Response(status=status.HTTP_204_NO_CONTENT), upload
+            )
+
+        serializer = serializers.RecipeImageSerializer(
+            upload.recipe,
+            context=self.get_serializer_context()
+        )
+
+        return upload_headers(
+            Response(serializer.data, status=status.HTTP_202_ACCEPTED),
+            upload
+        )
+
+
+class AsyncRecipeViewSet(AsyncViewMixin, RecipeViewSet):
+    """
+    Recipes served as async views under ASGI (app.asgi_urls)
+    """
+
+
+class AsyncImageUploadViewSet(AsyncViewMixin, ImageUploadViewSet):
+    """
+    Resumable image uploads served as async views under ASGI
+    (app.asgi_urls)
+    """